@@ -1,7 +1,104 @@
-class UsageLimits:
-    MAX_FILES = 3                 
-    
-    DAILY_QUIZ_QUESTIONS = 20     
-    DAILY_TUTOR_QUESTIONS = 15   
-    DAILY_COACH_MSGS = 10         
-    DAILY_PODCASTS = 1
\ No newline at end of file
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class UsageLimits:
+    MAX_FILES = 3                 
+    
+    DAILY_QUIZ_QUESTIONS = 20     
+    DAILY_TUTOR_QUESTIONS = 15   
+    DAILY_COACH_MSGS = 10         
+    DAILY_PODCASTS = 1
+
+
+class RagSettings:
+    # Vector store backend: "pinecone" (remote), "local" (memory-mapped NumPy files) or "memory" (nothing persisted)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+    PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "learning-assistant")
+    LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "app/data/vector_index")
+    # Local index only: "none", "int8" or "binary" codes in memory, float32 rows on disk for re-ranking
+    LOCAL_INDEX_QUANTIZATION = os.getenv("LOCAL_INDEX_QUANTIZATION", "none").lower()
+    QUANTIZED_RERANK_FACTOR = int(os.getenv("QUANTIZED_RERANK_FACTOR", "8"))
+    EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+    # Content-hash keyed embedding cache (shared across users and re-uploads)
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "app/data/cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+    # retrieve() caches: query text -> vector (LRU) and per-document top-k results (TTL)
+    QUERY_VECTOR_CACHE_SIZE = int(os.getenv("QUERY_VECTOR_CACHE_SIZE", "2048"))
+    RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "4096"))
+    RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "600"))
+    # Ingestion pipeline: chunks per FastEmbed call, vectors per upsert, batches buffered between stages
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+    UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+    # Upsert batches written concurrently, and per-batch retries (exponential backoff with jitter)
+    UPSERT_MAX_IN_FLIGHT = int(os.getenv("UPSERT_MAX_IN_FLIGHT", "4"))
+    UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", "5"))
+    UPSERT_RETRY_BASE_DELAY = float(os.getenv("UPSERT_RETRY_BASE_DELAY", "0.5"))
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+    # Embedding worker pool: "thread" or "process", one FastEmbed model per worker
+    MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", os.path.join(os.getcwd(), "model_cache"))
+    EMBED_EXECUTOR = os.getenv("EMBED_EXECUTOR", "thread").lower()
+    EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "2"))
+    EMBED_MAX_PENDING = int(os.getenv("EMBED_MAX_PENDING", "32"))
+    # Concurrent query embeddings are batched: up to N queries or a few ms of waiting
+    QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", "32"))
+    QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "3"))
+    # Background /upload jobs (SQLite-backed, resumable per upserted batch)
+    INGESTION_DB_PATH = os.getenv("INGESTION_DB_PATH", "app/data/ingestion_jobs.sqlite3")
+    INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "1"))
+    # /delete-book cleanup journal: failed cleanup steps are retried with backoff (seconds)
+    DELETION_DB_PATH = os.getenv("DELETION_DB_PATH", "app/data/deletion_jobs.sqlite3")
+    DELETION_RETRY_DELAY = float(os.getenv("DELETION_RETRY_DELAY", "5"))
+    DELETION_MAX_RETRY_DELAY = float(os.getenv("DELETION_MAX_RETRY_DELAY", "300"))
+    # PDF parsing: "sequential" (PyPDFLoader) or "parallel" (page ranges in a process pool)
+    PDF_PARSE_MODE = os.getenv("PDF_PARSE_MODE", "parallel").lower()
+    PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS") or max(1, (os.cpu_count() or 2) - 1))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+    # Hybrid retrieval: per-document BM25 index fused with dense results (RRF)
+    HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+    LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "app/data/lexical_index")
+    LEXICAL_FASTPATH_MARGIN = float(os.getenv("LEXICAL_FASTPATH_MARGIN", "2.0"))
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    # /chat: retrieve the raw message while the search query is rephrased; a rephrased
+    # search "agrees" with it if their top chunks overlap by this share (0.6 = 2 of 3)
+    SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+    SPECULATIVE_MIN_OVERLAP = float(os.getenv("SPECULATIVE_MIN_OVERLAP", "0.6"))
+    # Skip the rephrase call for follow-ups that read as standalone questions
+    SPECULATIVE_SKIP_REPHRASE = os.getenv("SPECULATIVE_SKIP_REPHRASE", "false").lower() == "true"
+    # /chat semantic answer cache (first plain-mode questions, shared per stored PDF):
+    # cosine similarity threshold of the question embeddings; VERIFY re-checks each hit's chunks
+    ANSWER_CACHE = os.getenv("ANSWER_CACHE", "true").lower() == "true"
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+    ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+    ANSWER_CACHE_VERIFY = os.getenv("ANSWER_CACHE_VERIFY", "true").lower() == "true"
+    # /chat history context: the last N messages per (user, book), kept in memory for
+    # up to CONVERSATIONS conversations (least recently used evicted first)
+    CHAT_TURN_CACHE = os.getenv("CHAT_TURN_CACHE", "true").lower() == "true"
+    CHAT_TURN_CACHE_TURNS = int(os.getenv("CHAT_TURN_CACHE_TURNS", "4"))
+    CHAT_TURN_CACHE_CONVERSATIONS = int(os.getenv("CHAT_TURN_CACHE_CONVERSATIONS", "10000"))
+    # GET /chat_history page size (default, and the cap on ?limit=)
+    CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "50"))
+    CHAT_HISTORY_MAX_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_MAX_PAGE_SIZE", "200"))
+    # Prompt context packing (/chat and /generate-quiz): token budgets, MMR relevance weight,
+    # and the similarity at which a retrieved span counts as a duplicate of one already packed
+    CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "750"))
+    QUIZ_CONTEXT_TOKENS = int(os.getenv("QUIZ_CONTEXT_TOKENS", "1500"))
+    CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+    CONTEXT_MAX_SIMILARITY = float(os.getenv("CONTEXT_MAX_SIMILARITY", "0.8"))
+    # /chat images: "azure" (Azure OpenAI) or "local" (stand-in, no remote calls); images are
+    # downscaled to MAX_SIDE pixels and descriptions cached by perceptual hash (256 bits;
+    # 0 = identical hashes only; HASH_DISTANCE > 0 reuses descriptions of hashes that many
+    # bits apart, which can answer for a slightly edited image)
+    VISION_BACKEND = os.getenv("VISION_BACKEND", "azure").lower()
+    VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", "1024"))
+    VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "80"))
+    VISION_TIMEOUT_SECONDS = float(os.getenv("VISION_TIMEOUT_SECONDS", "20"))
+    VISION_CACHE_SIZE = int(os.getenv("VISION_CACHE_SIZE", "1024"))
+    VISION_HASH_DISTANCE = int(os.getenv("VISION_HASH_DISTANCE", "0"))
+    # Per-document chunk manifests (vector ids) for incremental re-ingestion
+    MANIFEST_DIR = os.getenv("MANIFEST_DIR", "app/data/manifests")
+    # Chunk texts, looked up by vector id after each query (kept out of vector metadata)
+    CHUNK_STORE_PATH = os.getenv("CHUNK_STORE_PATH", "app/data/chunks.sqlite3")
\ No newline at end of file
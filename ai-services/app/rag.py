@@ -1,130 +1,477 @@
-import os
-import time
-from dotenv import load_dotenv
-from pinecone import Pinecone, ServerlessSpec
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_huggingface import HuggingFaceEndpointEmbeddings
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
-load_dotenv()
- 
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-INDEX_NAME = "learning-assistant"
-
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
- 
-# embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-
-MODEL_CACHE_DIR = os.path.join(os.getcwd(), "model_cache")
-
-print(f"Loading FastEmbed model from: {MODEL_CACHE_DIR}...")
- 
-embeddings = FastEmbedEmbeddings(
-    model_name="BAAI/bge-small-en-v1.5",
-    cache_path=MODEL_CACHE_DIR 
-)
-
-def load_pdf(file_path):
-    loader = PyPDFLoader(file_path)
-    documents = loader.load()
-    return documents
-
-def chunk_text(documents):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = text_splitter.split_documents(documents)
-    return chunks
-
- 
-async def store_in_pinecone(chunks, filename, user_id, progress_callback=None):
-    """
-    Embeds chunks in BATCHES (Much faster) and uploads to Pinecone.
-    """
-    index = pc.Index(INDEX_NAME)
-    vectors = []
-    total_chunks = len(chunks)
-    
-    print(f"Starting batch embedding for {total_chunks} chunks...")
-
-    # --- BATCH EMBEDDING SETTINGS ---
-    # Hugging Face Free Tier usually handles ~32 texts per request reliably.
-    BATCH_SIZE = 32 
-    
-    # 1. Process chunks in batches
-    for i in range(0, total_chunks, BATCH_SIZE):
-        batch_chunks = chunks[i : i + BATCH_SIZE]
-        batch_texts = [c.page_content for c in batch_chunks]
-        
-        # This sends ONE request for 32 chunks!
-        try:
-            batch_embeddings = embeddings.embed_documents(batch_texts)
-        except Exception as e:
-            print(f"Error embedding batch {i}: {e}")
-            continue
-
-        # 2. Pack the results
-        for j, (chunk, vector_values) in enumerate(zip(batch_chunks, batch_embeddings)):
-            # Calculate absolute index
-            absolute_index = i + j
-            
-            metadata = {
-                "text": chunk.page_content,
-                "filename": filename,
-                "chunk_id": absolute_index,
-                "user_id": user_id   
-            }
-            
-            vector_id = f"{user_id}_{filename}_{absolute_index}"
-            
-            vectors.append({
-                "id": vector_id, 
-                "values": vector_values, 
-                "metadata": metadata
-            })
-
-        # Update Progress (Visual feedback for user)
-        if progress_callback:
-            current_progress = min(i + BATCH_SIZE, total_chunks)
-            await progress_callback(current_progress, total_chunks, "Embedding & Processing...")
-
-    # --- Uploading to Pinecone ---
-    # Pinecone handles large upserts well, 100 is a good size.
-    print(f"Uploading {len(vectors)} vectors to Pinecone...")
-    
-    upsert_batch_size = 100
-    for i in range(0, len(vectors), upsert_batch_size):
-        batch = vectors[i : i + upsert_batch_size]
-        index.upsert(vectors=batch)
-        
-        if progress_callback:
-             await progress_callback(total_chunks, total_chunks, "Saving to Database...")
-    
-    print("Upload complete.")
-
-
-def retrieve(question, filename, user_id, k=3):
-    """
-    Queries Pinecone for relevant chunks.
-    STRICTLY filters by user_id and filename.
-    """
-    index = pc.Index(INDEX_NAME)
-     
-    query_vector = embeddings.embed_query(question)
-     
-    query_filter = {
-        "filename": filename,
-        "user_id": user_id  
-    }
-    
-    #  Query Pinecone
-    results = index.query(
-        vector=query_vector,
-        top_k=k,
-        include_metadata=True,
-        filter=query_filter
-    )
-    
-    #  Extract Text
-    context_chunks = [match['metadata']['text'] for match in results['matches']]
-    return context_chunks
\ No newline at end of file
+import asyncio
+from dotenv import load_dotenv
+from pypdf import PdfReader
+from app.config import RagSettings
+from app.services.vector_store import vector_store, document_scope, scope_of, scope_key
+from app.services.embedding_cache import embedding_cache
+from app.services.retrieval_cache import retrieval_cache
+from app.services.embedding_executor import embedding_executor
+from app.services.pdf_loader import load_pdf_pages
+from app.services.chunker import chunk_documents
+from app.services.lexical_index import LexicalIndex, lexical_store, reciprocal_rank_fusion
+from app.services.document_registry import document_registry
+from app.services.chunk_manifest import manifest_store, chunk_vector_ids
+from app.services.chunk_store import chunk_store
+from app.services.upsert_writer import UpsertWriter
+from app.services.answer_cache import answer_cache, AnswerSlot
+load_dotenv()
+ 
+# FastEmbed (BAAI/bge-small-en-v1.5) runs inside embedding_executor's worker pool,
+# one model per worker, so embedding never blocks the event loop.
+
+def chunk_text(documents):
+    # Same boundaries as RecursiveCharacterTextSplitter(1000, 200), stored as offsets
+    chunks = chunk_documents(documents, chunk_size=1000, chunk_overlap=200)
+    return chunks
+
+
+async def embed_texts(texts):
+    """
+    Embeds chunk texts, reusing cached vectors for any text seen before.
+    Only cache misses go through FastEmbed (in the worker pool).
+    """
+    # The cache is SQLite (blocking reads and commits): keep it off the event loop
+    vectors = await asyncio.to_thread(embedding_cache.get_many, texts)
+    missing = [i for i, v in enumerate(vectors) if v is None]
+
+    if missing:
+        new_vectors = await embedding_executor.embed_documents([texts[i] for i in missing])
+        await asyncio.to_thread(embedding_cache.put_many, [texts[i] for i in missing], new_vectors)
+        for i, vector in zip(missing, new_vectors):
+            vectors[i] = vector
+
+    return vectors
+
+
+def build_vector(chunk, absolute_index, vector_values, filename, user_id, storage_key=None, vector_id=None):
+    # Only filter fields go into metadata: the text itself lives in chunk_store
+    if storage_key:
+        # Shared by every user who uploaded the same PDF; the id comes from the
+        # chunk text (chunk_vector_ids), chunk_id is its position when it was stored
+        metadata = {
+            "storage_key": storage_key,
+            "chunk_id": absolute_index
+        }
+    else:
+        metadata = {
+            "filename": filename,
+            "chunk_id": absolute_index,
+            "user_id": user_id   
+        }
+        vector_id = f"{user_id}_{filename}_{absolute_index}"
+    
+    return {
+        "id": vector_id, 
+        "values": vector_values, 
+        "metadata": metadata
+    }
+
+ 
+async def ingest_pdf(file_path, filename, user_id, progress_callback=None,
+                     start_chunk=0, checkpoint_callback=None, storage_key=None):
+    """
+    Streaming ingestion of a PDF into the vector store.
+    Three stages run at the same time, connected by bounded queues:
+      pages -> chunker  ==>  embed batches  ==>  upsert batches
+    Only a few batches are ever in memory, whatever the size of the PDF,
+    and the upload takes about as long as its slowest stage.
+
+    Resuming: chunks before `start_chunk` are skipped (chunking is deterministic),
+    and `checkpoint_callback(next_chunk)` is awaited after every upserted batch.
+    With a `storage_key`, vectors and the lexical index are stored under it
+    (shared by all owners) instead of under (user_id, filename), and the ingest
+    is incremental: chunks already listed in the document's manifest are not
+    embedded or upserted again, and vectors of chunks that disappeared from a
+    revised PDF are deleted at the end.
+    The manifest only ever lists vectors that are stored: it is saved after every
+    committed batch (so a crash or failure mid-way leaves it accurate for the next
+    run) and a batch that cannot be embedded fails the job instead of being skipped.
+    """
+    queue_size = RagSettings.PIPELINE_QUEUE_SIZE
+    embed_queue = asyncio.Queue(maxsize=queue_size)
+    upsert_queue = asyncio.Queue(maxsize=queue_size)
+    total_pages = await asyncio.to_thread(lambda: len(PdfReader(file_path).pages)) or 1
+    stats = {"chunks": 0, "upserted": 0, "unchanged": 0}
+    # Built from every chunk (including resumed-over ones) and saved at the end
+    lexical = LexicalIndex()
+    scope = document_scope(user_id, filename, storage_key)
+    stored_list = (await asyncio.to_thread(manifest_store.load, scope) or []) if storage_key else []
+    stored_ids = set(stored_list)
+    vector_ids, seen_texts = [], {}
+    # Ids upserted by this run, in commit (= chunk) order
+    committed_ids = []
+
+    async def chunk_stage():
+        pages = await asyncio.to_thread(load_pdf_pages, file_path)
+        batch = []
+        while True:
+            # Page extraction is blocking, so pull one page at a time off the loop
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                break
+            for chunk in chunk_text([page]):
+                index = stats["chunks"]
+                stats["chunks"] += 1
+                if storage_key:
+                    vector_id = chunk_vector_ids(storage_key, [chunk.page_content], seen_texts)[0]
+                    vector_ids.append(vector_id)
+                else:
+                    vector_id = f"{user_id}_{filename}_{index}"
+                lexical.add(index, chunk.page_content, vector_id)
+                if index < start_chunk:
+                    continue
+                if vector_id in stored_ids:
+                    stats["unchanged"] += 1
+                    continue
+                batch.append((index, chunk, vector_id))
+                if len(batch) == RagSettings.EMBED_BATCH_SIZE:
+                    await embed_queue.put(batch)
+                    batch = []
+        if batch:
+            await embed_queue.put(batch)
+        await embed_queue.put(None)
+
+    async def embed_stage():
+        while (batch := await embed_queue.get()) is not None:
+            texts = [chunk.page_content for _, chunk, _ in batch]
+            try:
+                batch_embeddings = await embed_texts(texts)
+            except Exception as e:
+                # Skipping it would leave the document silently incomplete
+                raise RuntimeError(f"Embedding failed for chunks from {batch[0][0]}: {e}") from e
+            vectors = [
+                build_vector(chunk, index, values, filename, user_id, storage_key, vector_id)
+                for (index, chunk, vector_id), values in zip(batch, batch_embeddings)
+            ]
+            # Texts are stored before their vectors, so a match always has its text
+            await asyncio.to_thread(
+                chunk_store.put_many, scope, [(vector["id"], text) for vector, text in zip(vectors, texts)]
+            )
+            # Carry the page of the last chunk along for progress reporting
+            await upsert_queue.put((vectors, batch[-1][1].metadata.get("page", 0)))
+        await upsert_queue.put(None)
+
+    async def commit(marker):
+        # Called in order, once this batch and all earlier ones are stored
+        count, next_chunk, last_page, ids = marker
+        stats["upserted"] += count
+        if storage_key:
+            committed_ids.extend(ids)
+            # Stored so far: what was there before plus this run's batches
+            await asyncio.to_thread(
+                manifest_store.save, scope, stored_list + [i for i in committed_ids if i not in stored_ids]
+            )
+        if checkpoint_callback:
+            await checkpoint_callback(next_chunk)
+        if progress_callback:
+            await progress_callback(min(last_page + 1, total_pages), total_pages, "Embedding & Saving...")
+
+    writer = UpsertWriter(vector_store, on_commit=commit)
+
+    async def upsert_stage():
+        pending = []
+        last_page = 0
+
+        async def flush():
+            ids = [vector["id"] for vector in pending] if storage_key else []
+            marker = (len(pending), pending[-1]["metadata"]["chunk_id"] + 1, last_page, ids)
+            # Waits while too many batches are in flight: backpressure on embed_stage
+            await writer.submit(pending[:], marker)
+            pending.clear()
+
+        while (item := await upsert_queue.get()) is not None:
+            vectors, last_page = item
+            pending.extend(vectors)
+            if len(pending) >= RagSettings.UPSERT_BATCH_SIZE:
+                await flush()
+        if pending:
+            await flush()
+        await writer.drain()
+
+    print(f"Streaming ingestion of {total_pages} pages for {filename} (from chunk {start_chunk})...")
+    tasks = [
+        asyncio.create_task(chunk_stage()),
+        asyncio.create_task(embed_stage()),
+        asyncio.create_task(upsert_stage())
+    ]
+    try:
+        await asyncio.gather(*tasks)
+        if storage_key:
+            # Chunks that are not in the new version of the PDF any more
+            removed = list(stored_ids.difference(vector_ids))
+            if removed:
+                await asyncio.to_thread(vector_store.delete_ids, scope, removed)
+                await asyncio.to_thread(chunk_store.delete_ids, removed)
+            # Every chunk of the new version is stored: before start_chunk by an earlier
+            # run, unchanged ones from before, the others by this run
+            stored_now = stored_ids.union(committed_ids)
+            manifest = [
+                vector_id for index, vector_id in enumerate(vector_ids)
+                if index < start_chunk or vector_id in stored_now
+            ]
+            await asyncio.to_thread(manifest_store.save, scope, manifest)
+            stats["removed"] = len(removed)
+        await asyncio.to_thread(lexical_store.save, scope, lexical)
+    except Exception:
+        # One stage failed: stop the others instead of leaving them blocked on a queue
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await writer.cancel()
+        raise
+    finally:
+        retrieval_cache.invalidate_document(user_id, filename)
+
+    if progress_callback:
+        await progress_callback(total_pages, total_pages, "Saving to Database...")
+    print(f"Upload complete. {stats['upserted']}/{stats['chunks']} chunks stored, "
+          f"{stats['unchanged']} unchanged, {stats.get('removed', 0)} removed. "
+          f"Embedding cache: {embedding_cache.stats()}")
+
+
+def keyword_confident(lexical, query, hits, n_terms):
+    """
+    True when BM25 alone is trustworthy: the best chunk contains every query
+    term and clearly beats the runner-up (LEXICAL_FASTPATH_MARGIN).
+    """
+    if not hits or not n_terms:
+        return False
+    top_id, top_score = hits[0]
+    if lexical.matched_terms(top_id, query) < n_terms:
+        return False
+    runner_up = hits[1][1] if len(hits) > 1 else 0.0
+    return top_score >= RagSettings.LEXICAL_FASTPATH_MARGIN * runner_up
+
+
+async def embed_question(query):
+    """Query vector from retrieval_cache, or one (micro-batched) FastEmbed call."""
+    query_vector = retrieval_cache.get_vector(query)
+    if query_vector is None:
+        query_vector = await embedding_executor.embed_query(query)
+        retrieval_cache.set_vector(query, query_vector)
+    return query_vector
+
+
+async def answer_slot(question, user_id, filename):
+    """
+    Semantic answer cache lookup for `question` about the user's document
+    (answers are shared by everyone holding the same stored PDF).
+    """
+    query = question.strip()
+    storage_key = await document_registry.resolve(user_id, filename)
+    scope = scope_key(document_scope(user_id, filename, storage_key))
+    vector = await embed_question(query)
+    return AnswerSlot(scope, vector, query, answer_cache.lookup(scope, vector))
+
+
+def lexical_texts(lexical, chunk_ids):
+    """
+    Chunk texts for BM25 hits, in one chunk_store lookup.
+    Lexical indexes saved before they stored vector ids still hold the texts.
+    """
+    known = [chunk_id for chunk_id in chunk_ids if chunk_id in lexical.vector_ids]
+    stored = dict(zip(known, chunk_store.get_many([lexical.vector_ids[c] for c in known]))) if known else {}
+    texts = []
+    for chunk_id in chunk_ids:
+        text = stored.get(chunk_id) or lexical.texts.get(chunk_id)
+        if text:
+            texts.append(text)
+    return texts
+
+
+def match_texts(matches):
+    """
+    Chunk texts for vector matches, in one chunk_store lookup.
+    Vectors stored before chunk_store still carry their text in metadata.
+    """
+    texts = []
+    for match, text in zip(matches, chunk_store.get_many([m['id'] for m in matches])):
+        text = text if text is not None else match['metadata'].get('text')
+        if text:
+            texts.append(text)
+    return texts
+
+
+async def retrieve(question, filename, user_id, k=3):
+    """
+    Hybrid retrieval for one document, STRICTLY filtered by the user's reference to it
+    (its storage key, or user_id and filename for documents stored before dedup).
+    - Keyword fast path: a confident BM25 hit answers without embedding the query.
+    - Otherwise dense results and BM25 results are merged with reciprocal-rank fusion.
+    - Documents without a lexical index fall back to dense search only.
+    Repeated questions are answered from retrieval_cache.
+    """
+    query = question.strip()
+
+    cached_chunks = retrieval_cache.get_results(user_id, filename, query, k)
+    if cached_chunks is not None:
+        return cached_chunks
+
+    storage_key = await document_registry.resolve(user_id, filename)
+    scope = document_scope(user_id, filename, storage_key)
+
+    lexical, lexical_hits = None, []
+    if RagSettings.HYBRID_RETRIEVAL:
+        lexical = await asyncio.to_thread(lexical_store.load, scope)
+    if lexical:
+        lexical_hits, n_terms = lexical.search(query, max(k * 4, 10))
+        if keyword_confident(lexical, query, lexical_hits, n_terms):
+            context_chunks = await asyncio.to_thread(
+                lexical_texts, lexical, [chunk_id for chunk_id, _ in lexical_hits[:k]]
+            )
+            lexical_store.record("keyword_fast_path")
+            retrieval_cache.set_results(user_id, filename, query, k, context_chunks)
+            return context_chunks
+
+    query_vector = await embed_question(query)
+     
+    #  Query the configured backend (Pinecone or local index)
+    dense_k = k * 2 if lexical_hits else k
+    matches = await asyncio.to_thread(vector_store.query, query_vector, scope, dense_k)
+    dense_texts = await asyncio.to_thread(match_texts, matches)
+    
+    if lexical_hits:
+        keyword_texts = await asyncio.to_thread(
+            lexical_texts, lexical, [chunk_id for chunk_id, _ in lexical_hits]
+        )
+        #  Fuse dense and keyword rankings by chunk text
+        # (stored chunk positions go stale after an incremental re-ingest, the text does not)
+        context_chunks = reciprocal_rank_fusion(
+            [
+                dense_texts,
+                keyword_texts
+            ],
+            RagSettings.RRF_K
+        )[:k]
+        lexical_store.record("hybrid")
+    else:
+        #  Extract Text
+        context_chunks = dense_texts
+        lexical_store.record("dense_only")
+
+    retrieval_cache.set_results(user_id, filename, query, k, context_chunks)
+    return context_chunks
+
+
+async def retrieve_library(question, user_id, filenames=None, k=5):
+    """
+    Dense retrieval over ALL of the user's documents (or the `filenames` subset)
+    in one pass: one query embedding, one vector-store query, one chunk-text lookup,
+    however many books the user has.
+    Returns [{"text", "filename", "score", "relevance"}], best first; `score` is
+    the cosine similarity (comparable across books, same model and unit vectors)
+    and `relevance` is that score scaled to the best hit (1.0).
+    """
+    query = question.strip()
+    documents = await document_registry.list_documents(user_id)
+    if filenames is not None:
+        wanted = set(filenames)
+        documents = [d for d in documents if d["filename"] in wanted]
+    if not documents:
+        return []
+
+    # Provenance: which of the user's files each stored document belongs to
+    # (two filenames holding the same PDF share one storage scope)
+    scopes, owners = [], {}
+    for d in documents:
+        scope = document_scope(user_id, d["filename"], d.get("storage_key"))
+        if scope_key(scope) not in owners:
+            owners[scope_key(scope)] = d["filename"]
+            scopes.append(scope)
+
+    query_vector = await embed_question(query)
+    matches = await asyncio.to_thread(vector_store.query_many, query_vector, scopes, k)
+    texts = await asyncio.to_thread(chunk_store.get_many, [m['id'] for m in matches])
+
+    results = []
+    for match, text in zip(matches, texts):
+        text = text if text is not None else match['metadata'].get('text')
+        if not text:
+            continue
+        results.append({
+            "text": text,
+            "filename": owners.get(scope_key(scope_of(match['metadata']))),
+            "score": round(match['score'], 4)
+        })
+
+    best = max((r["score"] for r in results), default=0.0)
+    for r in results:
+        r["relevance"] = round(r["score"] / best, 4) if best > 0 else 0.0
+    return results
+
+
+def delete_stored_document(scope):
+    """Removes one stored document: vectors, lexical index and chunk manifest."""
+    vector_store.delete_document(scope)
+    lexical_store.delete(scope)
+    manifest_store.delete(scope)
+    chunk_store.delete_document(scope)
+    answer_cache.invalidate(scope_key(scope))
+
+
+async def release_storage(user_id, filename, storage_key):
+    """
+    Deletes a stored document that is no longer referenced (e.g. the previous
+    version after a re-upload). Pre-dedup documents belong to one user only.
+    """
+    if storage_key and await document_registry.references(storage_key):
+        return False
+    await asyncio.to_thread(delete_stored_document, document_scope(user_id, filename, storage_key))
+    return True
+
+
+async def repoint_document(user_id, filename, content_hash, storage_key):
+    """
+    Points the user's document at `storage_key` (new upload, or new version of
+    it) and releases the version it replaced.
+    """
+    previous = await document_registry.lookup(user_id, filename)
+    await document_registry.register(user_id, filename, content_hash, storage_key)
+    await release_replaced(user_id, filename, previous, storage_key)
+
+
+async def link_document(user_id, filename, content_hash):
+    """
+    Points the user's document at the stored copy of an identical PDF and
+    releases the version it replaced. Returns the storage_key, or None when no
+    stored copy is (still) referenced and the PDF has to be ingested.
+    """
+    previous = await document_registry.lookup(user_id, filename)
+    storage_key = await document_registry.link(user_id, filename, content_hash)
+    if storage_key:
+        await release_replaced(user_id, filename, previous, storage_key)
+    return storage_key
+
+
+async def release_replaced(user_id, filename, previous, storage_key):
+    """After a re-point: releases the `previous` version and drops cached results."""
+    try:
+        if previous and previous.get("storage_key") != storage_key:
+            await release_storage(user_id, filename, previous.get("storage_key"))
+    finally:
+        retrieval_cache.invalidate_document(user_id, filename)
+        if previous and previous.get("storage_key") == storage_key:
+            # Revised edition re-ingested in place: same storage key, new content
+            answer_cache.invalidate(scope_key(document_scope(user_id, filename, storage_key)))
+
+
+async def delete_document(user_id, filename, storage_key=None):
+    """
+    Drops the user's reference to a document and its cached retrieval results.
+    The vectors and lexical index are only removed when no other user still
+    references the same content.
+    `storage_key` (if known beforehand) lets a retried delete finish even when
+    the reference itself was already dropped.
+    """
+    try:
+        released, remaining = await document_registry.release(user_id, filename)
+        if released:
+            storage_key = released
+        elif storage_key:
+            remaining = await document_registry.references(storage_key)
+        if remaining == 0:
+            await asyncio.to_thread(delete_stored_document, document_scope(user_id, filename, storage_key))
+        else:
+            print(f"Kept shared vectors for {storage_key[:12]} ({remaining} other owner(s))")
+    finally:
+        retrieval_cache.invalidate_document(user_id, filename)
\ No newline at end of file
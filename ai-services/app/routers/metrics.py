@@ -0,0 +1,38 @@
+import asyncio
+from fastapi import APIRouter
+from app.services.embedding_cache import embedding_cache
+from app.services.retrieval_cache import retrieval_cache
+from app.services.embedding_executor import embedding_executor
+from app.services.lexical_index import lexical_store
+from app.services.chunk_store import chunk_store
+from app.services.deletion_jobs import deletion_journal
+from app.services.chat_metrics import chat_metrics
+from app.services.speculative_retrieval import speculative_retriever
+from app.services.answer_cache import answer_cache
+from app.services.context_packer import context_packer
+from app.services.chat_turn_cache import chat_turn_cache
+from app.services.vision_service import vision_pipeline
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Cache and pipeline counters for tuning the RAG service.
+    """
+    # Totals come from a SQLite aggregate over every chunk: not on the event loop
+    chunk_stats = await asyncio.to_thread(chunk_store.stats)
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "retrieval_cache": retrieval_cache.stats(),
+        "embedding_executor": embedding_executor.stats(),
+        "hybrid_retrieval": lexical_store.stats(),
+        "chunk_store": chunk_stats,
+        "book_cleanup": deletion_journal.stats(),
+        "chat_latency": chat_metrics.stats(),
+        "speculative_retrieval": speculative_retriever.stats(),
+        "answer_cache": answer_cache.stats(),
+        "context_packer": context_packer.stats(),
+        "chat_turn_cache": chat_turn_cache.stats(),
+        "vision": vision_pipeline.stats()
+    }
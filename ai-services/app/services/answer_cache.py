@@ -0,0 +1,157 @@
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from app.config import RagSettings
+from app.services.speculative_retrieval import chunk_overlap
+
+
+class AnswerSlot:
+    """One /chat turn's place in the answer cache: its lookup result and where its answer goes."""
+
+    def __init__(self, scope: str, vector, question: str, entry: dict | None):
+        self.scope = scope
+        self.vector = vector
+        self.question = question
+        self.entry = entry
+        self.context = []  # chunks the answer is generated from
+
+    @property
+    def answer(self) -> str | None:
+        return self.entry["answer"] if self.entry else None
+
+
+class AnswerCache:
+    """
+    Semantic cache of plain-mode tutor answers, per STORED document: everyone
+    holding the same PDF (same storage key) shares the entries.
+    - lookup() returns the entry whose question embedding is most similar to
+      the new one, if the cosine similarity reaches `threshold`.
+    - Entries expire after `ttl` seconds, the least recently used go first once
+      `max_entries` is reached, and invalidate(scope) drops a document's
+      entries when it is deleted or re-ingested.
+    - confirm() checks a hit against the chunks the new question retrieves; if
+      the answer was built from different chunks it is a false hit (evicted).
+    Only first questions without history are cached: the answer must not
+    depend on the conversation before it.
+    """
+
+    def __init__(self, enabled: bool, max_entries: int, ttl: float, threshold: float,
+                 verify: bool, min_overlap: float = 0.6):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.verify = verify
+        self.min_overlap = min_overlap
+
+        self._entries = OrderedDict()  # entry id -> entry, least recently used first
+        self._by_scope = {}            # scope -> {entry id}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.verified_hits = 0
+        self.false_hits = 0
+        self.expired = 0
+
+    def _drop(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        ids = self._by_scope.get(entry["scope"])
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_scope[entry["scope"]]
+
+    def lookup(self, scope: str, vector) -> dict | None:
+        vector = np.asarray(vector, dtype=np.float32)
+        now = time.monotonic()
+        with self._lock:
+            best, best_score = None, self.threshold
+            for entry_id in list(self._by_scope.get(scope, ())):
+                entry = self._entries[entry_id]
+                if entry["expires_at"] < now:
+                    self._drop(entry_id)
+                    self.expired += 1
+                    continue
+                # Unit vectors: dot product = cosine similarity
+                score = float(entry["vector"] @ vector)
+                if score >= best_score:
+                    best, best_score = entry, score
+
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best["id"])
+            self.hits += 1
+            return best
+
+    def store(self, scope: str, vector, question: str, answer: str, context: list):
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "id": entry_id,
+                "scope": scope,
+                "vector": np.asarray(vector, dtype=np.float32),
+                "question": question,
+                "answer": answer,
+                "context": [hash(chunk) for chunk in context],
+                "expires_at": time.monotonic() + self.ttl
+            }
+            self._by_scope.setdefault(scope, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def fill(self, slot: AnswerSlot, answer: str):
+        """Caches the answer of a missed lookup, if it was generated from book context."""
+        if slot.entry is None and slot.context and answer:
+            self.store(slot.scope, slot.vector, slot.question, answer, slot.context)
+
+    def confirm(self, slot: AnswerSlot, chunks: list) -> bool:
+        """
+        False if the new question retrieves other chunks than the cached answer
+        was built from; the entry is then evicted and the slot becomes a miss.
+        """
+        entry = slot.entry
+        with self._lock:
+            self.verified_hits += 1
+            if chunk_overlap(entry["context"], [hash(chunk) for chunk in chunks]) >= self.min_overlap:
+                return True
+            self.false_hits += 1
+            self.hits -= 1
+            self.misses += 1
+            if entry["id"] in self._entries:
+                self._drop(entry["id"])
+        slot.entry = None
+        return False
+
+    def invalidate(self, scope: str):
+        with self._lock:
+            for entry_id in list(self._by_scope.get(scope, ())):
+                self._drop(entry_id)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "documents": len(self._by_scope),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "verified_hits": self.verified_hits,
+            "false_hits": self.false_hits,
+            "false_hit_rate": round(self.false_hits / self.verified_hits, 4) if self.verified_hits else 0.0,
+            "expired": self.expired
+        }
+
+
+answer_cache = AnswerCache(
+    RagSettings.ANSWER_CACHE,
+    RagSettings.ANSWER_CACHE_MAX_ENTRIES,
+    RagSettings.ANSWER_CACHE_TTL_SECONDS,
+    RagSettings.ANSWER_CACHE_THRESHOLD,
+    RagSettings.ANSWER_CACHE_VERIFY
+)
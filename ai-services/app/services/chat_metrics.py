@@ -0,0 +1,33 @@
+from app.services.micro_batcher import Histogram
+
+LATENCY_BOUNDS_MS = (250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+class ChatMetrics:
+    """
+    /chat answer latency per transport ("blocking" or "stream") and tutor mode,
+    measured from the request's arrival:
+    - ttft_ms  : until the first answer token reaches the client
+    - total_ms : until the whole answer has been sent
+    """
+
+    def __init__(self):
+        self.ttft_ms = {}
+        self.total_ms = {}
+
+    def observe(self, transport: str, mode: str, ttft_ms: float, total_ms: float):
+        key = f"{transport}:{mode}"
+        if key not in self.ttft_ms:
+            self.ttft_ms[key] = Histogram(LATENCY_BOUNDS_MS)
+            self.total_ms[key] = Histogram(LATENCY_BOUNDS_MS)
+        self.ttft_ms[key].observe(ttft_ms)
+        self.total_ms[key].observe(total_ms)
+
+    def stats(self) -> dict:
+        return {
+            key: {"ttft_ms": self.ttft_ms[key].snapshot(), "total_ms": self.total_ms[key].snapshot()}
+            for key in sorted(self.ttft_ms)
+        }
+
+
+chat_metrics = ChatMetrics()
@@ -0,0 +1,101 @@
+import asyncio
+from collections import OrderedDict, deque
+from app.config import RagSettings
+
+
+class ChatTurnCache:
+    """
+    Read-through cache of the last `turns` chat messages per (user_id, filename),
+    so /chat builds its history context without reading chat_history.
+    - recent() loads a conversation from the database once (concurrent misses
+      share the load) and serves it from memory afterwards.
+    - append() updates a cached conversation in place after each insert; the
+      ring buffer keeps only the newest `turns` messages.
+    - At most `max_conversations` are kept; the least recently used goes first.
+    The cache is per process: messages written by another API process are not
+    seen until the conversation is evicted here.
+    """
+
+    def __init__(self, enabled: bool, turns: int, max_conversations: int):
+        self.enabled = enabled
+        self.turns = turns
+        self.max_conversations = max_conversations
+
+        self._buffers = OrderedDict()  # (user_id, filename) -> deque of messages, least recently used first
+        self._loading = {}             # (user_id, filename) -> load task
+        self._stale = set()            # keys written to while their load was running
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def recent(self, user_id: str, filename: str, load) -> list:
+        """
+        The last `turns` messages, oldest first. `load()` reads them from the
+        database on a miss.
+        """
+        if not self.enabled:
+            return await load()
+
+        key = (user_id, filename)
+        buffer = self._buffers.get(key)
+        if buffer is not None:
+            self._buffers.move_to_end(key)
+            self.hits += 1
+            return list(buffer)
+
+        self.misses += 1
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(load())
+            self._loading[key] = task
+            self._stale.discard(key)
+            try:
+                messages = await asyncio.shield(task)
+            finally:
+                del self._loading[key]
+            if key in self._stale:
+                # A message was saved during the load and may be missing from it
+                self._stale.discard(key)
+            else:
+                self._buffers[key] = deque(messages, maxlen=self.turns)
+                while len(self._buffers) > self.max_conversations:
+                    self._buffers.popitem(last=False)
+                    self.evictions += 1
+            return list(messages)[-self.turns:]
+
+        return list(await asyncio.shield(task))[-self.turns:]
+
+    def append(self, user_id: str, filename: str, role: str, content: str):
+        """Records a message saved to chat_history."""
+        key = (user_id, filename)
+        buffer = self._buffers.get(key)
+        if buffer is not None:
+            buffer.append({"role": role, "content": content})
+        elif key in self._loading:
+            self._stale.add(key)
+
+    def forget(self, user_id: str, filenames: list):
+        for filename in filenames:
+            key = (user_id, filename)
+            self._buffers.pop(key, None)
+            if key in self._loading:
+                self._stale.add(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "conversations": len(self._buffers),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+
+chat_turn_cache = ChatTurnCache(
+    RagSettings.CHAT_TURN_CACHE,
+    RagSettings.CHAT_TURN_CACHE_TURNS,
+    RagSettings.CHAT_TURN_CACHE_CONVERSATIONS
+)
@@ -0,0 +1,61 @@
+import os
+import json
+import hashlib
+from app.config import RagSettings
+from app.services.vector_store import scope_key
+
+
+def chunk_vector_ids(storage_key: str, texts: list, seen: dict = None) -> list:
+    """
+    Content-derived vector ids: the same chunk text always gets the same id,
+    wherever it moves in a revised PDF. Repeated texts get a counter suffix.
+    Pass the same `seen` dict across calls to number repeats over a whole document.
+    """
+    seen = {} if seen is None else seen
+    ids = []
+    for text in texts:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+        count = seen.get(digest, 0)
+        seen[digest] = count + 1
+        ids.append(f"{storage_key}_{digest}" if count == 0 else f"{storage_key}_{digest}_{count}")
+    return ids
+
+
+class ChunkManifestStore:
+    """
+    The vector ids currently stored for each document, in chunk order.
+    Re-ingesting a revised PDF diffs its ids against the manifest: only new
+    chunks are embedded and upserted, and ids that disappeared are deleted.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _path(self, scope: dict) -> str:
+        return os.path.join(self.root_dir, f"{scope_key(scope)}.json")
+
+    def exists(self, scope: dict) -> bool:
+        return os.path.exists(self._path(scope))
+
+    def load(self, scope: dict) -> list | None:
+        path = self._path(scope)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, scope: dict, ids: list):
+        path = self._path(scope)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(ids, f)
+        os.replace(tmp_path, path)
+
+    def delete(self, scope: dict):
+        path = self._path(scope)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+manifest_store = ChunkManifestStore(RagSettings.MANIFEST_DIR)
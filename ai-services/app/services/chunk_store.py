@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import threading
+from app.config import RagSettings
+from app.services.vector_store import scope_key
+
+
+class ChunkStore:
+    """
+    Local SQLite table of chunk texts keyed by vector id.
+    Vectors only carry their id and small filter fields; retrieve() looks the
+    texts of all its matches up here in one batched query.
+    Rows are grouped by document scope so a whole document can be dropped at once.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lookups = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                text TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_scope ON chunks(scope)")
+        self._conn.commit()
+
+    def put_many(self, scope: dict, items: list):
+        """items: [(vector id, text)]"""
+        key = scope_key(scope)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, scope, text) VALUES (?, ?, ?)",
+                [(vector_id, key, text) for vector_id, text in items]
+            )
+            self._conn.commit()
+
+    def get_many(self, ids: list) -> list:
+        """Returns the text (or None) for each id, in order."""
+        found = {}
+        with self._lock:
+            # SQLite caps bound parameters, so look ids up in slices
+            for i in range(0, len(ids), 500):
+                part = ids[i : i + 500]
+                placeholders = ",".join("?" * len(part))
+                found.update(self._conn.execute(
+                    f"SELECT id, text FROM chunks WHERE id IN ({placeholders})", part
+                ).fetchall())
+            self.lookups += len(ids)
+            self.misses += sum(1 for i in ids if i not in found)
+        return [found.get(i) for i in ids]
+
+    def delete_ids(self, ids: list):
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def delete_document(self, scope: dict):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE scope = ?", (scope_key(scope),))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(text)), 0) FROM chunks"
+            ).fetchone()
+        return {
+            "chunks": count,
+            "text_chars": size,
+            "lookups": self.lookups,
+            "misses": self.misses
+        }
+
+
+chunk_store = ChunkStore(RagSettings.CHUNK_STORE_PATH)
@@ -0,0 +1,185 @@
+from array import array
+from collections import deque
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ", "")
+
+
+class SpanChunker:
+    """
+    Offset-based re-implementation of
+    RecursiveCharacterTextSplitter(chunk_size, chunk_overlap) with its defaults
+    (separators "\\n\\n", "\\n", " ", "", keep_separator=True, strip_whitespace=True).
+    It produces the same chunk boundaries, but as (start, end) offsets into the
+    original text instead of copied strings.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, separators=DEFAULT_SEPARATORS):
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) is larger than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators)
+
+    def split_spans(self, text: str) -> list:
+        return self._split(text, 0, len(text), self.separators)
+
+    def _split(self, text, lo, hi, separators):
+        # Pick the first separator present in text[lo:hi] ("" always matches)
+        separator = separators[-1]
+        next_separators = ()
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, lo, hi) != -1:
+                separator = candidate
+                next_separators = separators[i + 1:]
+                break
+
+        spans = []
+        good = []
+        for start, end in self._split_on(text, lo, hi, separator):
+            if end - start < self.chunk_size:
+                good.append((start, end))
+                continue
+            if good:
+                spans.extend(self._merge(text, good))
+                good = []
+            if not next_separators:
+                spans.append((start, end))
+            else:
+                spans.extend(self._split(text, start, end, next_separators))
+        if good:
+            spans.extend(self._merge(text, good))
+        return spans
+
+    @staticmethod
+    def _split_on(text, lo, hi, separator):
+        """Contiguous, non-empty pieces; every piece after the first starts with the separator."""
+        if separator == "":
+            return [(i, i + 1) for i in range(lo, hi)]
+
+        pieces = []
+        start = lo
+        position = text.find(separator, lo, hi)
+        while position != -1:
+            if position > start:
+                pieces.append((start, position))
+            start = position
+            position = text.find(separator, position + len(separator), hi)
+        if hi > start:
+            pieces.append((start, hi))
+        return pieces
+
+    def _merge(self, text, pieces):
+        merged = []
+        window = deque()
+        total = 0
+        for start, end in pieces:
+            length = end - start
+            if total + length > self.chunk_size:
+                if window:
+                    span = _strip(text, window[0][0], window[-1][1])
+                    if span:
+                        merged.append(span)
+                    # Keep the tail of the window as overlap for the next chunk
+                    while total > self.chunk_overlap or (total + length > self.chunk_size and total > 0):
+                        first_start, first_end = window.popleft()
+                        total -= first_end - first_start
+            window.append((start, end))
+            total += length
+        span = _strip(text, window[0][0], window[-1][1]) if window else None
+        if span:
+            merged.append(span)
+        return merged
+
+
+def _strip(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if end > start else None
+
+
+class ChunkedDocument:
+    """
+    All pages of a document in ONE text buffer, with chunks kept as three
+    parallel arrays of (start, end, page) instead of one Document per chunk.
+    Chunk text is only sliced out when something asks for it.
+    """
+    __slots__ = ("text", "page_metadata", "starts", "ends", "pages")
+
+    def __init__(self, text: str, page_metadata: list):
+        self.text = text
+        self.page_metadata = page_metadata
+        self.starts = array("q")
+        self.ends = array("q")
+        self.pages = array("l")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Chunk(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return Chunk(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Chunk(self, i)
+
+    def chunk_text(self, index: int) -> str:
+        return self.text[self.starts[index]:self.ends[index]]
+
+
+class Chunk:
+    """
+    Lightweight view of one chunk. Quacks like a LangChain Document
+    (page_content / metadata), so existing callers keep working.
+    `metadata` is the page's dict, shared by all of its chunks: read it, don't mutate it.
+    """
+    __slots__ = ("document", "index")
+
+    def __init__(self, document: ChunkedDocument, index: int):
+        self.document = document
+        self.index = index
+
+    @property
+    def page_content(self) -> str:
+        return self.document.chunk_text(self.index)
+
+    @property
+    def metadata(self) -> dict:
+        return self.document.page_metadata[self.document.pages[self.index]]
+
+    @property
+    def start(self) -> int:
+        return self.document.starts[self.index]
+
+    @property
+    def end(self) -> int:
+        return self.document.ends[self.index]
+
+
+def chunk_documents(documents, chunk_size: int = 1000, chunk_overlap: int = 200) -> ChunkedDocument:
+    """
+    Splits LangChain page Documents into a ChunkedDocument.
+    Pages are split independently, exactly like split_documents() does.
+    """
+    chunker = SpanChunker(chunk_size, chunk_overlap)
+    texts = [doc.page_content for doc in documents]
+    chunked = ChunkedDocument("".join(texts), [doc.metadata for doc in documents])
+
+    offset = 0
+    for page, text in enumerate(texts):
+        for start, end in chunker.split_spans(text):
+            chunked.starts.append(offset + start)
+            chunked.ends.append(offset + end)
+            chunked.pages.append(page)
+        offset += len(text)
+    return chunked
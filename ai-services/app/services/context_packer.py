@@ -0,0 +1,190 @@
+import re
+import threading
+from app.config import RagSettings
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"[.!?](\s|$)")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimated LLM tokens: one per punctuation mark, one per word, plus one per
+    further 6 characters of long words (close to Llama's BPE on English prose).
+    """
+    return sum(1 + (len(piece) - 1) // 6 for piece in _TOKEN.findall(text))
+
+
+def overlap_length(a: str, b: str, min_chars: int, max_chars: int) -> int:
+    """Length of the longest suffix of `a` that is also a prefix of `b` (0 if under `min_chars`)."""
+    for length in range(min(len(a), len(b), max_chars), min_chars - 1, -1):
+        if a.endswith(b[:length]):
+            return length
+    return 0
+
+
+def shingles(text: str, size: int = 3) -> set:
+    words = [w.lower() for w in re.findall(r"\w+", text)]
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def similarity(a: set, b: set) -> float:
+    """Share of the smaller shingle set found in the other (1.0 when one span contains the other)."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """The longest prefix of `text` within `budget` tokens, cut at a sentence end when there is one."""
+    cut = 0
+    used = 0
+    for match in _TOKEN.finditer(text):
+        used += 1 + (len(match.group()) - 1) // 6
+        if used > budget:
+            break
+        cut = match.end()
+    prefix = text[:cut]
+    ends = [m.end() for m in _SENTENCE_END.finditer(prefix)]
+    if ends and ends[-1] > len(prefix) // 2:
+        prefix = prefix[:ends[-1]]
+    return prefix.rstrip()
+
+
+class PackedContext:
+    """The prompt context built from retrieved chunks."""
+
+    def __init__(self, text: str, spans: list, tokens: int, truncated: bool):
+        self.text = text
+        self.spans = spans
+        self.tokens = tokens
+        self.truncated = truncated
+
+
+class ContextPacker:
+    """
+    Packs retrieved chunks (best first) into a prompt context under a token budget:
+    1. Chunks that were neighbours in the PDF repeat the chunker's overlap
+       (up to `chunk_overlap` characters); they are merged into one span and
+       the repeated text is kept once.
+    2. Spans are picked by maximal marginal relevance: relevance (retrieval
+       rank) minus `1 - mmr_lambda` times the similarity to spans already
+       picked. Spans at least `max_similarity` alike (e.g. the same passage
+       on two pages) are dropped.
+    3. Picked spans are added until `budget` tokens are used. A span that does
+       not fit is skipped for smaller ones, except the first, which is cut at
+       a sentence end so the best match is never lost.
+    """
+
+    def __init__(self, mmr_lambda: float, max_similarity: float,
+                 min_overlap: int = 20, chunk_overlap: int = 200):
+        self.mmr_lambda = mmr_lambda
+        self.max_similarity = max_similarity
+        self.min_overlap = min_overlap
+        self.chunk_overlap = chunk_overlap
+
+        self._lock = threading.Lock()
+        self.packed = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.merged = 0
+        self.redundant = 0
+        self.over_budget = 0
+        self.truncated = 0
+
+    def merge_overlaps(self, chunks: list) -> tuple:
+        """
+        Merges chunks whose end overlaps another one's start.
+        Returns (spans, merges), spans in the rank order of their best chunk.
+        """
+        spans = list(chunks)
+        merges = 0
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(spans)):
+                for j in range(len(spans)):
+                    if i == j:
+                        continue
+                    length = overlap_length(spans[i], spans[j], self.min_overlap, self.chunk_overlap)
+                    if length:
+                        # Keep the merged span at the better rank of the two
+                        first, second = min(i, j), max(i, j)
+                        spans[first] = spans[i] + spans[j][length:]
+                        del spans[second]
+                        merges += 1
+                        merged = True
+                        break
+                if merged:
+                    break
+        return spans, merges
+
+    def select(self, spans: list) -> tuple:
+        """MMR order of the spans, and how many were dropped as redundant."""
+        candidates = [(rank, span, shingles(span)) for rank, span in enumerate(spans)]
+        n = len(candidates)
+        picked, redundant = [], 0
+        while candidates:
+            best, best_score, best_sim = None, None, 0.0
+            for candidate in candidates:
+                rank, _, grams = candidate
+                max_sim = max((similarity(grams, p[2]) for p in picked), default=0.0)
+                relevance = 1.0 - rank / n
+                score = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * max_sim
+                if best_score is None or score > best_score:
+                    best, best_score, best_sim = candidate, score, max_sim
+            candidates.remove(best)
+            if best_sim >= self.max_similarity:
+                redundant += 1
+                continue
+            picked.append(best)
+        return [span for _, span, _ in picked], redundant
+
+    def pack(self, chunks: list, budget: int) -> PackedContext:
+        chunks = [chunk.strip() for chunk in chunks if chunk and chunk.strip()]
+        spans, merges = self.merge_overlaps(list(dict.fromkeys(chunks)))
+        spans, redundant = self.select(spans)
+
+        packed, used, skipped, truncated = [], 0, 0, False
+        for span in spans:
+            tokens = count_tokens(span)
+            if used + tokens <= budget:
+                packed.append(span)
+                used += tokens
+            elif not packed:
+                span = truncate_to_tokens(span, budget)
+                packed.append(span)
+                used += count_tokens(span)
+                truncated = True
+            else:
+                skipped += 1
+
+        with self._lock:
+            self.packed += 1
+            self.tokens_in += sum(count_tokens(chunk) for chunk in chunks)
+            self.tokens_out += used
+            self.merged += merges
+            self.redundant += redundant
+            self.over_budget += skipped
+            self.truncated += truncated
+
+        return PackedContext("\n\n".join(packed), packed, used, truncated)
+
+    def stats(self) -> dict:
+        return {
+            "packed": self.packed,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "token_savings": round(1 - self.tokens_out / self.tokens_in, 4) if self.tokens_in else 0.0,
+            "merged_overlaps": self.merged,
+            "redundant_spans": self.redundant,
+            "over_budget_spans": self.over_budget,
+            "truncated": self.truncated
+        }
+
+
+context_packer = ContextPacker(
+    RagSettings.CONTEXT_MMR_LAMBDA,
+    RagSettings.CONTEXT_MAX_SIMILARITY
+)
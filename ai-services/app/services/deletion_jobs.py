@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from app.config import RagSettings
+
+
+class DeletionJournal:
+    """
+    Local, SQLite-backed journal for /delete-book.
+    - tombstone() durably records the delete and returns right away; from then
+      on is_deleted()/hidden() report the document as gone, so reads can hide it
+      before any row is actually removed.
+    - A worker task runs the cleanup steps of a job CONCURRENTLY. Each step is
+      recorded in the journal once it succeeds, so a retry only re-runs the
+      steps that failed (or were interrupted by a restart).
+    - A job with a failed step is retried in the background with exponential
+      backoff until every step has succeeded.
+    """
+
+    def __init__(self, db_path: str, retry_delay: float, max_retry_delay: float):
+        self.db_path = db_path
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._steps = {}
+        self._queue = None
+        self._tasks = []
+        self._lock = threading.Lock()
+
+        self.completed = 0
+        self.step_failures = 0
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS deletion_jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                storage_key TEXT,
+                status TEXT NOT NULL,
+                done_steps TEXT NOT NULL DEFAULT '[]',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_deletions_status ON deletion_jobs(status)")
+        self._conn.commit()
+
+        # Tombstones are checked on every read, so keep them in memory
+        self._hidden = {
+            (row["user_id"], row["filename"])
+            for row in self._conn.execute("SELECT user_id, filename FROM deletion_jobs WHERE status = 'pending'")
+        }
+
+    # --- persistence helpers ---
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE deletion_jobs SET {columns} WHERE id = ?", (*fields.values(), job_id)
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM deletion_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def _find_pending(self, user_id: str, filename: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM deletion_jobs WHERE user_id = ? AND filename = ? AND status = 'pending' "
+                "ORDER BY created_at DESC LIMIT 1",
+                (user_id, filename)
+            ).fetchone()
+        return dict(row) if row else None
+
+    # --- public API ---
+    def tombstone(self, user_id: str, filename: str, storage_key: str = None) -> str:
+        """
+        Marks the document deleted and queues its cleanup (or returns the
+        pending job). `storage_key` is kept so a retried cleanup still finds the
+        stored document after its documents row is gone.
+        """
+        pending = self._find_pending(user_id, filename)
+        if pending:
+            return pending["id"]
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO deletion_jobs (id, user_id, filename, storage_key, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?, ?)",
+                (job_id, user_id, filename, storage_key, now, now)
+            )
+            self._conn.commit()
+            self._hidden.add((user_id, filename))
+
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+        return job_id
+
+    def is_deleted(self, user_id: str, filename: str) -> bool:
+        return (user_id, filename) in self._hidden
+
+    def hidden(self, user_id: str) -> set:
+        """Filenames of the user's documents that are deleted but not cleaned up yet."""
+        with self._lock:
+            return {filename for user, filename in self._hidden if user == user_id}
+
+    def start(self, steps: dict):
+        """
+        Starts the worker task. `steps` maps a step name to `fn(job)`, either a
+        coroutine function or a blocking one (run in a thread); every step must
+        be safe to run again after a partial run.
+        Pending jobs from before a restart are picked up again.
+        """
+        self._steps = steps
+        self._queue = asyncio.Queue()
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM deletion_jobs WHERE status = 'pending' ORDER BY created_at"
+            ).fetchall()
+        for row in rows:
+            print(f"Resuming book cleanup {row['id']}...")
+            self._queue.put_nowait(row["id"])
+
+        self._tasks = [asyncio.create_task(self._worker())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self.get(job_id)
+            if not job or job["status"] != "pending":
+                continue
+            # One job at a time; its steps run concurrently
+            await self._run(job)
+
+    async def _run(self, job: dict):
+        job_id = job["id"]
+        done = set(json.loads(job["done_steps"]))
+        todo = [name for name in self._steps if name not in done]
+
+        async def run_step(name):
+            step = self._steps[name]
+            if asyncio.iscoroutinefunction(step):
+                await step(job)
+            else:
+                await asyncio.to_thread(step, job)
+            done.add(name)
+            # Persist right away: a crash now must not repeat this step
+            await asyncio.to_thread(self._update, job_id, done_steps=json.dumps(sorted(done)))
+
+        results = await asyncio.gather(*(run_step(name) for name in todo), return_exceptions=True)
+        errors = [f"{name}: {r}" for name, r in zip(todo, results) if isinstance(r, BaseException)]
+
+        if not errors:
+            self._update(job_id, status="done", attempts=job["attempts"] + 1, error=None)
+            with self._lock:
+                self._hidden.discard((job["user_id"], job["filename"]))
+            self.completed += 1
+            print(f"Book cleanup {job_id} done ({job['filename']})")
+            return
+
+        self.step_failures += len(errors)
+        attempts = job["attempts"] + 1
+        self._update(job_id, attempts=attempts, error="; ".join(errors))
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** (attempts - 1))
+        print(f"Book cleanup {job_id} incomplete ({'; '.join(errors)}), retry in {delay:.1f}s")
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._hidden)
+        return {"pending": pending, "completed": self.completed, "step_failures": self.step_failures}
+
+
+deletion_journal = DeletionJournal(
+    RagSettings.DELETION_DB_PATH,
+    RagSettings.DELETION_RETRY_DELAY,
+    RagSettings.DELETION_MAX_RETRY_DELAY
+)
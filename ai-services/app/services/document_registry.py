@@ -0,0 +1,103 @@
+import hashlib
+from app.services.retrieval_cache import LRUCache
+from app.supabase.repositories import DocumentRepository, documents_repo
+
+
+def save_and_hash(source, path: str, block_size: int = 1 << 20) -> str:
+    """
+    Copies an uploaded file to `path` and returns the sha256 of its bytes.
+    Blocking (file I/O over the whole upload): call it in a thread.
+    """
+    digest = hashlib.sha256()
+    with open(path, "wb") as buffer:
+        while block := source.read(block_size):
+            digest.update(block)
+            buffer.write(block)
+    return digest.hexdigest()
+
+
+class DocumentRegistry:
+    """
+    The `documents` table as a reference table.
+    Each row (user_id, filename) points at a storage_key, the scope its chunks,
+    vectors and indexes are stored under, and records the content_hash of the
+    PDF it holds. Identical PDFs share one storage_key, so they are embedded and
+    stored once. Rows from before dedup have neither and keep their per-user vectors.
+    Table access goes through the async DocumentRepository; lookups are cached.
+    """
+
+    def __init__(self, repo: DocumentRepository, max_size: int = 4096):
+        self.repo = repo
+        # (user_id, filename) -> {"content_hash", "storage_key"}
+        self._rows = LRUCache(max_size)
+
+    async def lookup(self, user_id: str, filename: str) -> dict | None:
+        key = (user_id, filename)
+        cached = self._rows.get(key)
+        if cached is not None:
+            return cached
+
+        row = await self.repo.get(user_id, filename)
+        if row is None:
+            return None
+        self._rows.set(key, row)
+        return row
+
+    async def list_documents(self, user_id: str) -> list:
+        """All of the user's documents as [{"filename", "content_hash", "storage_key"}]."""
+        rows = await self.repo.for_user(user_id)
+        for row in rows:
+            self._rows.set((user_id, row["filename"]), {
+                "content_hash": row.get("content_hash"),
+                "storage_key": row.get("storage_key")
+            })
+        return rows
+
+    async def resolve(self, user_id: str, filename: str) -> str | None:
+        """The storage_key behind the user's document (None for pre-dedup documents)."""
+        row = await self.lookup(user_id, filename)
+        return row.get("storage_key") if row else None
+
+    async def link(self, user_id: str, filename: str, content_hash: str) -> str | None:
+        """
+        Points the user's reference at wherever this exact PDF is already stored.
+        Returns the storage_key, or None if no finished upload of it is referenced.
+        Atomic with release(): a storage whose last reference is being dropped is
+        never linked to.
+        """
+        storage_key = await self.repo.link(user_id, filename, content_hash)
+        if storage_key:
+            self._rows.set((user_id, filename), {"content_hash": content_hash, "storage_key": storage_key})
+        return storage_key
+
+    async def references(self, storage_key: str) -> int:
+        return await self.repo.count_storage_refs(storage_key)
+
+    async def register(self, user_id: str, filename: str, content_hash: str | None, storage_key: str | None):
+        """Adds the user's reference, or re-points it after a re-upload."""
+        row = {"content_hash": content_hash, "storage_key": storage_key}
+        if not await self.repo.update(user_id, filename, row):
+            await self.repo.add({"filename": filename, "user_id": user_id, **row})
+        self._rows.set((user_id, filename), row)
+
+    async def mark_revising(self, user_id: str, filename: str):
+        """
+        Clears the content_hash while the stored document is rewritten in place,
+        so no new upload links to content that is about to change.
+        """
+        await self.repo.update(user_id, filename, {"content_hash": None})
+        self._rows.pop_where(lambda key: key == (user_id, filename))
+
+    async def release(self, user_id: str, filename: str) -> tuple:
+        """
+        Drops the user's reference.
+        Returns (storage_key, references left); the caller deletes the stored
+        document only when no references are left. Dropping the row and
+        counting what is left is one repository call, so no link() to the same
+        storage can slip in between.
+        """
+        self._rows.pop_where(lambda key: key == (user_id, filename))
+        return await self.repo.release(user_id, filename)
+
+
+document_registry = DocumentRegistry(documents_repo)
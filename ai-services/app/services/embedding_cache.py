@@ -0,0 +1,129 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from app.config import RagSettings
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache shared by every user.
+    - Key   : sha256(model name + chunk text), so identical textbook chunks hit
+              no matter who uploads them or under which filename.
+    - Value : float32 vector bytes.
+    - Bound : at most `max_entries` rows, least-recently-used rows are evicted.
+    The row count is read once at open and then kept in memory, so neither
+    puts nor stats() scan the table.
+    """
+
+    def __init__(self, path: str, model_name: str, max_entries: int):
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: list) -> list:
+        """Returns one vector (list of floats) or None per text, in order."""
+        keys = [self._key(t) for t in texts]
+        found = {}
+
+        with self._lock:
+            # SQLite caps bound parameters, so look keys up in slices
+            for i in range(0, len(keys), 500):
+                part = keys[i : i + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, k) for k in found]
+                )
+                self._conn.commit()
+
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += sum(1 for k in keys if k not in found)
+
+        return [
+            np.frombuffer(found[k], dtype=np.float32).tolist() if k in found else None
+            for k in keys
+        ]
+
+    def put_many(self, texts: list, vectors: list):
+        now = time.time()
+        # Keyed by cache key: a text repeated in the batch is one row
+        rows = {
+            self._key(t): (self._key(t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        }
+        keys = list(rows)
+        with self._lock:
+            existing = 0
+            for i in range(0, len(keys), 500):
+                part = keys[i : i + 500]
+                placeholders = ",".join("?" * len(part))
+                (found,) = self._conn.execute(
+                    f"SELECT COUNT(*) FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchone()
+                existing += found
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", list(rows.values())
+            )
+            self._count += len(rows) - existing
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        overflow = self._count - self.max_entries
+        if overflow > 0:
+            deleted = self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            ).rowcount
+            self._count -= deleted
+            self.evictions += deleted
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+embedding_cache = EmbeddingCache(
+    RagSettings.EMBEDDING_CACHE_PATH,
+    RagSettings.EMBEDDING_MODEL,
+    RagSettings.EMBEDDING_CACHE_MAX_ENTRIES
+)
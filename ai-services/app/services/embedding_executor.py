@@ -0,0 +1,150 @@
+import time
+import asyncio
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from app.config import RagSettings
+from app.services.micro_batcher import MicroBatcher
+
+# One FastEmbed model per worker (thread or process), created by _init_worker
+_worker = threading.local()
+
+
+def _init_worker(model_name: str, cache_dir: str):
+    from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+
+    print(f"Loading FastEmbed model from: {cache_dir}...")
+    _worker.model = FastEmbedEmbeddings(model_name=model_name, cache_path=cache_dir)
+
+
+def _embed_documents(texts: list) -> list:
+    return _worker.model.embed_documents(texts)
+
+
+def _embed_queries(texts: list) -> list:
+    model = _worker.model
+    fastembed_model = getattr(model, "_model", None)
+    if fastembed_model is None:
+        return [model.embed_query(text) for text in texts]
+    # One ONNX run for the whole batch (same path embed_query uses for one text)
+    return [vector.tolist() for vector in fastembed_model.query_embed(texts)]
+
+
+class EmbeddingExecutor:
+    """
+    Runs FastEmbed in a worker pool so CPU-bound inference never blocks the event loop.
+    - mode="thread"  : ThreadPoolExecutor (ONNX releases the GIL while it runs)
+    - mode="process" : ProcessPoolExecutor (full isolation, one model copy per process)
+    At most `max_pending` jobs are submitted at once; extra callers wait their turn.
+    Concurrent embed_query() calls are micro-batched into one inference
+    (up to `query_batch_size` queries or `query_batch_wait_ms`).
+    """
+
+    def __init__(self, mode: str, workers: int, max_pending: int, model_name: str, cache_dir: str,
+                 query_batch_size: int = 32, query_batch_wait_ms: float = 3.0):
+        self.mode = mode
+        self.workers = workers
+        self.max_pending = max_pending
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = asyncio.Semaphore(max_pending)
+        self._query_batcher = MicroBatcher(self._embed_query_batch, query_batch_size, query_batch_wait_ms)
+
+        self.waiting = 0       # callers blocked on a free slot
+        self.running = 0       # jobs handed to the pool
+        self.completed = 0
+        self.failed = 0
+        self._latencies = deque(maxlen=500)   # seconds per job, most recent last
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                init_args = (self.model_name, self.cache_dir)
+                if self.mode == "process":
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker, initargs=init_args
+                    )
+                elif self.mode == "thread":
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="embed",
+                        initializer=_init_worker, initargs=init_args
+                    )
+                else:
+                    raise ValueError(f"Unknown EMBED_EXECUTOR mode: {self.mode}")
+            return self._pool
+
+    async def _submit(self, fn, arg):
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_pool(), fn, arg)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._latencies.append(time.perf_counter() - started)
+            self.running -= 1
+            self._slots.release()
+
+    async def embed_documents(self, texts: list) -> list:
+        if not texts:
+            return []
+        return await self._submit(_embed_documents, texts)
+
+    async def _embed_query_batch(self, texts: list) -> list:
+        return await self._submit(_embed_queries, texts)
+
+    async def embed_query(self, text: str) -> list:
+        return await self._query_batcher.submit(text)
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "queue_depth": self.waiting + self.running,
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+            "query_batching": self._query_batcher.stats()
+        }
+
+
+embedding_executor = EmbeddingExecutor(
+    RagSettings.EMBED_EXECUTOR,
+    RagSettings.EMBED_WORKERS,
+    RagSettings.EMBED_MAX_PENDING,
+    RagSettings.EMBEDDING_MODEL,
+    RagSettings.MODEL_CACHE_DIR,
+    RagSettings.QUERY_BATCH_SIZE,
+    RagSettings.QUERY_BATCH_WAIT_MS
+)
@@ -0,0 +1,176 @@
+import os
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from app.config import RagSettings
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class IngestionJobQueue:
+    """
+    Local, SQLite-backed queue for /upload work.
+    - submit() records the job and returns its id immediately.
+    - Worker tasks run the handler; the handler reports the number of chunks
+      safely upserted through `checkpoint`, which is persisted per batch.
+    - On startup every queued/running job is picked up again and the handler
+      is told where the last run stopped, so it resumes instead of restarting.
+    """
+
+    def __init__(self, db_path: str, workers: int = 1):
+        self.db_path = db_path
+        self.workers = workers
+        self._queue = None
+        self._tasks = []
+        self._handler = None
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                checkpoint INTEGER NOT NULL DEFAULT 0,
+                progress_current INTEGER NOT NULL DEFAULT 0,
+                progress_total INTEGER NOT NULL DEFAULT 0,
+                message TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(ingestion_jobs)")}
+        # Job databases created before content-addressed storage
+        for column in ("content_hash", "storage_key"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE ingestion_jobs ADD COLUMN {column} TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON ingestion_jobs(status)")
+        self._conn.commit()
+
+    # --- persistence helpers ---
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE ingestion_jobs SET {columns} WHERE id = ?", (*fields.values(), job_id)
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find_active(self, user_id: str, filename: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM ingestion_jobs WHERE user_id = ? AND filename = ? "
+                "AND status IN (?, ?) ORDER BY created_at DESC LIMIT 1",
+                (user_id, filename, *ACTIVE_STATUSES)
+            ).fetchone()
+        return dict(row) if row else None
+
+    # --- public API ---
+    def submit(self, user_id: str, filename: str, file_path: str,
+               content_hash: str = None, storage_key: str = None) -> str:
+        """Queues a job (or returns the one already running for this file)."""
+        active = self.find_active(user_id, filename)
+        if active:
+            return active["id"]
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ingestion_jobs "
+                "(id, user_id, filename, file_path, content_hash, storage_key, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, user_id, filename, file_path, content_hash, storage_key, now, now)
+            )
+            self._conn.commit()
+
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+        return job_id
+
+    def start(self, handler):
+        """
+        Starts the worker tasks. `handler(job, checkpoint, report)` is awaited per job:
+        - checkpoint(next_chunk) persists how many chunks are safely stored
+        - report(current, total, status) persists and forwards progress
+        It returns the final status message.
+        """
+        self._handler = handler
+        self._queue = asyncio.Queue()
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM ingestion_jobs WHERE status IN (?, ?) ORDER BY created_at",
+                ACTIVE_STATUSES
+            ).fetchall()
+        for row in rows:
+            print(f"Resuming ingestion job {row['id']}...")
+            self._queue.put_nowait(row["id"])
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await asyncio.to_thread(self.get, job_id)
+                if not job or job["status"] not in ACTIVE_STATUSES:
+                    continue
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep serving the queue: one bad job must not strand the ones after it
+                print(f"Ingestion worker error on job {job_id}: {e}")
+
+    async def _record(self, job_id: str, **fields):
+        """Persists job fields; a failed write is logged instead of ending the job or the worker."""
+        try:
+            await asyncio.to_thread(self._update, job_id, **fields)
+        except Exception as e:
+            print(f"Could not record {', '.join(fields)} for ingestion job {job_id}: {e}")
+
+    async def _run(self, job: dict):
+        job_id = job["id"]
+        await self._record(job_id, status="running", attempts=job["attempts"] + 1, error=None)
+
+        async def checkpoint(next_chunk: int):
+            # A lost checkpoint only means a resumed run redoes a few batches
+            await self._record(job_id, checkpoint=next_chunk)
+
+        async def report(current: int, total: int, status: str):
+            await self._record(job_id, progress_current=current, progress_total=total, message=status)
+
+        try:
+            message = await self._handler(job, checkpoint, report)
+        except asyncio.CancelledError:
+            # Shutdown: leave the job 'running' so the next start resumes it
+            raise
+        except Exception as e:
+            print(f"Ingestion job {job_id} failed: {e}")
+            await self._record(job_id, status="failed", error=str(e))
+            return
+        await self._record(job_id, status="done", message=message)
+        print(f"Ingestion job {job_id} done: {message}")
+
+ingestion_queue = IngestionJobQueue(RagSettings.INGESTION_DB_PATH, RagSettings.INGESTION_WORKERS)
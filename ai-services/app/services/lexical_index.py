@@ -0,0 +1,157 @@
+import os
+import re
+import json
+import math
+import shutil
+import threading
+from collections import Counter
+from app.config import RagSettings
+from app.services.retrieval_cache import LRUCache
+from app.services.vector_store import scope_key
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have how in is it its of on or that the this
+to was were what when where which who why will with about explain define describe
+does do did can could should would me my i you your tell give between vs
+""".split())
+
+
+def tokenize(text: str) -> list:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over the chunks of ONE document.
+    Chunk ids are the same absolute indexes used in vector metadata ("chunk_id"),
+    so lexical and dense hits can be fused by id. Only the postings and each
+    chunk's vector id are kept: the texts are looked up in chunk_store.
+    """
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self):
+        self.postings = {}     # term -> {chunk_id: term frequency}
+        self.doc_len = {}      # chunk_id -> number of tokens
+        self.vector_ids = {}   # chunk_id -> vector id (chunk_store key of its text)
+        self.texts = {}        # chunk_id -> chunk text, only in indexes saved before vector_ids
+        self._avgdl = None
+
+    def add(self, chunk_id: int, text: str, vector_id: str):
+        tokens = tokenize(text)
+        self.doc_len[chunk_id] = len(tokens)
+        self.vector_ids[chunk_id] = vector_id
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+        self._avgdl = None
+
+    def search(self, query: str, top_k: int) -> tuple:
+        """Returns ([(chunk_id, score)] best first, number of distinct query terms)."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        n_docs = len(self.doc_len)
+        if not terms or not n_docs:
+            return [], len(terms)
+
+        if self._avgdl is None:
+            self._avgdl = (sum(self.doc_len.values()) / n_docs) or 1.0
+
+        scores = {}
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log((n_docs - len(postings) + 0.5) / (len(postings) + 0.5) + 1.0)
+            for chunk_id, tf in postings.items():
+                norm = self.K1 * (1 - self.B + self.B * self.doc_len[chunk_id] / self._avgdl)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return ranked, len(terms)
+
+    def matched_terms(self, chunk_id: int, query: str) -> int:
+        terms = set(tokenize(query))
+        return sum(1 for t in terms if chunk_id in self.postings.get(t, ()))
+
+    def to_dict(self) -> dict:
+        return {
+            "doc_len": self.doc_len,
+            "vector_ids": self.vector_ids,
+            "postings": self.postings
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LexicalIndex":
+        index = cls()
+        # JSON object keys are strings; chunk ids are ints
+        index.doc_len = {int(k): v for k, v in data["doc_len"].items()}
+        index.vector_ids = {int(k): v for k, v in data.get("vector_ids", {}).items()}
+        index.texts = {int(k): v for k, v in data.get("texts", {}).items()}
+        index.postings = {
+            term: {int(k): tf for k, tf in postings.items()}
+            for term, postings in data["postings"].items()
+        }
+        return index
+
+
+class LexicalIndexStore:
+    """
+    One lexical.json per document scope under `root_dir`, built at ingest
+    time and loaded on demand into a small LRU of in-memory indexes.
+    """
+
+    def __init__(self, root_dir: str, max_loaded: int = 64):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+        self._loaded = LRUCache(max_loaded)
+        self._lock = threading.Lock()
+        self.counters = {"keyword_fast_path": 0, "hybrid": 0, "dense_only": 0}
+
+    def _path(self, scope: dict) -> str:
+        return os.path.join(self.root_dir, scope_key(scope), "lexical.json")
+
+    def save(self, scope: dict, index: LexicalIndex):
+        path = self._path(scope)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f)
+        os.replace(tmp_path, path)
+        self._loaded.set(path, index)
+
+    def load(self, scope: dict) -> LexicalIndex | None:
+        path = self._path(scope)
+        index = self._loaded.get(path)
+        if index is not None:
+            return index
+        if not os.path.exists(path):
+            return None
+        with self._lock:
+            with open(path, "r", encoding="utf-8") as f:
+                index = LexicalIndex.from_dict(json.load(f))
+        self._loaded.set(path, index)
+        return index
+
+    def delete(self, scope: dict):
+        path = self._path(scope)
+        self._loaded.pop_where(lambda key: key == path)
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    def record(self, route: str):
+        self.counters[route] += 1
+
+    def stats(self) -> dict:
+        return {"routes": dict(self.counters), "loaded_indexes": self._loaded.stats()}
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """Fuses several best-first id lists; returns ids ordered by RRF score."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+lexical_store = LexicalIndexStore(RagSettings.LEXICAL_INDEX_DIR)
@@ -0,0 +1,99 @@
+import time
+import asyncio
+from bisect import bisect_left
+
+
+class Histogram:
+    """Fixed-bucket histogram; bucket "le_X" counts observations <= X."""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        buckets = {f"le_{b:g}": c for b, c in zip(self.bounds, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.total,
+            "mean": round(self.sum / self.total, 3) if self.total else 0.0,
+            "buckets": buckets
+        }
+
+
+class MicroBatcher:
+    """
+    Dynamic batching for single-item async calls.
+    Concurrent calls are collected for up to `max_wait_ms` (or until `max_batch`
+    items are waiting), then `run_batch(items)` is awaited ONCE for all of them
+    and every caller's future gets its own result. Identical items in one batch
+    are only processed once.
+    """
+
+    def __init__(self, run_batch, max_batch: int, max_wait_ms: float):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._pending = []     # (item, future, enqueued at)
+        self._timer = None
+        self._tasks = set()
+
+        self.batch_sizes = Histogram((1, 2, 4, 8, 16, 32, 64))
+        self.wait_ms = Histogram((0.5, 1, 2, 5, 10, 20, 50, 100))
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            # Keep a reference so the task is not garbage-collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        flushed = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for _, _, enqueued in batch:
+            self.wait_ms.observe((flushed - enqueued) * 1000)
+
+        unique = list(dict.fromkeys(item for item, _, _ in batch))
+        try:
+            results = dict(zip(unique, await self.run_batch(unique)))
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for item, future, _ in batch:
+            # A caller may have been cancelled (e.g. client disconnected) meanwhile
+            if not future.done():
+                future.set_result(results[item])
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": len(self._pending),
+            "batch_size": self.batch_sizes.snapshot(),
+            "wait_ms": self.wait_ms.snapshot()
+        }
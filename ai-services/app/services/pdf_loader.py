@@ -0,0 +1,112 @@
+import math
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+from langchain_core.documents import Document
+from langchain_community.document_loaders import PyPDFLoader
+from app.config import RagSettings
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=RagSettings.PDF_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> list:
+    """Runs in a worker process: returns the text of pages [start, end)."""
+    import pypdf
+
+    reader = PdfReader(file_path)
+    texts = []
+    for page_number in range(start, end):
+        page = reader.pages[page_number]
+        # Same extraction call PyPDFLoader makes for this pypdf version
+        if pypdf.__version__.startswith("3"):
+            text = page.extract_text()
+        else:
+            text = page.extract_text(extraction_mode="plain")
+        texts.append(text.strip())
+    return texts
+
+
+def iter_pdf_pages(file_path: str, pages_per_task: int = None):
+    """
+    Parallel drop-in for PyPDFLoader(file_path).lazy_load().
+    The page list is split into ranges that are extracted in a process pool,
+    and Documents are yielded strictly in page order with the same metadata.
+    Only a few ranges are in flight at once, so memory stays bounded.
+    """
+    reader = PdfReader(file_path)
+    total_pages = len(reader.pages)
+    if total_pages == 0:
+        return
+    page_labels = list(reader.page_labels)
+
+    # Page 0 goes through PyPDFLoader itself: it yields the exact document-level
+    # metadata (producer, source, total_pages, ...) the sequential loader would use.
+    first_page = next(PyPDFLoader(file_path).lazy_load())
+    yield first_page
+    if total_pages == 1:
+        return
+
+    doc_metadata = {k: v for k, v in first_page.metadata.items() if k not in ("page", "page_label")}
+    has_labels = "page_label" in first_page.metadata
+
+    workers = RagSettings.PDF_PARSE_WORKERS
+    if not pages_per_task:
+        pages_per_task = max(8, math.ceil((total_pages - 1) / (workers * 4)))
+
+    ranges = [
+        (start, min(start + pages_per_task, total_pages))
+        for start in range(1, total_pages, pages_per_task)
+    ]
+
+    pool = _get_pool()
+    in_flight = deque()
+    next_range = 0
+    max_in_flight = workers * 2
+
+    while next_range < len(ranges) or in_flight:
+        while next_range < len(ranges) and len(in_flight) < max_in_flight:
+            start, end = ranges[next_range]
+            in_flight.append((start, pool.submit(_extract_page_range, file_path, start, end)))
+            next_range += 1
+
+        start, future = in_flight.popleft()
+        for offset, text in enumerate(future.result()):
+            page_number = start + offset
+            metadata = doc_metadata | {"page": page_number}
+            if has_labels:
+                metadata["page_label"] = page_labels[page_number]
+            yield Document(page_content=text, metadata=metadata)
+
+
+def load_pdf_pages(file_path: str):
+    """
+    Returns a page iterator for `file_path` using the configured PDF_PARSE_MODE.
+    Small PDFs always use the sequential loader (process startup would dominate).
+    """
+    if RagSettings.PDF_PARSE_MODE == "parallel":
+        page_count = len(PdfReader(file_path).pages)
+        if page_count >= RagSettings.PDF_PARALLEL_MIN_PAGES:
+            return iter_pdf_pages(file_path)
+    return PyPDFLoader(file_path).lazy_load()
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,99 @@
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# Rows scored per step, so the float copy of an int8 block stays small
+_BLOCK_ROWS = 8192
+
+# Bits set in every byte value (np.bitwise_count only exists in NumPy >= 2)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def quantize_int8(values: np.ndarray) -> tuple:
+    """
+    Symmetric scalar quantization, one scale per row:
+    row ~= codes * scale, with codes in [-127, 127].
+    """
+    values = np.asarray(values, dtype=np.float32)
+    scales = np.abs(values).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(values / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def binarize(values: np.ndarray) -> np.ndarray:
+    """Sign bit of every dimension, packed 8 per byte (384 dims -> 48 bytes)."""
+    return np.packbits(np.asarray(values) > 0, axis=1)
+
+
+def int8_scores(codes: np.ndarray, scales: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Approximate dot products of a float query with int8 rows."""
+    query = np.asarray(query, dtype=np.float32)
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), _BLOCK_ROWS):
+        block = codes[start:start + _BLOCK_ROWS]
+        scores[start:start + len(block)] = block.astype(np.float32) @ query
+    return scores * scales
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """Number of differing sign bits between every packed row and the query."""
+    xor = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[xor].sum(axis=1, dtype=np.int32)
+
+
+class QuantizedCodes:
+    """
+    In-memory compact codes for the rows of one float32 matrix.
+    - "int8"   : 1 byte per dimension + one float scale per row (~4x smaller)
+    - "binary" : 1 bit per dimension (32x smaller), ranked by Hamming distance
+    The full-precision rows stay on disk and are only read to re-rank candidates.
+    """
+
+    def __init__(self, mode: str, dim: int):
+        if mode not in ("int8", "binary"):
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        self.mode = mode
+        self.dim = dim
+        width = dim if mode == "int8" else (dim + 7) // 8
+        self.codes = np.zeros((0, width), dtype=np.int8 if mode == "int8" else np.uint8)
+        self.scales = np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def set_rows(self, rows, values: np.ndarray):
+        """Writes the codes of `values` at `rows`, growing the arrays as needed."""
+        rows = np.asarray(rows, dtype=np.int64)
+        size = int(rows.max()) + 1 if len(rows) else 0
+        if size > len(self.codes):
+            grow = size - len(self.codes)
+            self.codes = np.concatenate([self.codes, np.zeros((grow, self.codes.shape[1]), self.codes.dtype)])
+            self.scales = np.concatenate([self.scales, np.ones(grow, dtype=np.float32)])
+
+        if self.mode == "int8":
+            codes, scales = quantize_int8(values)
+            self.codes[rows] = codes
+            self.scales[rows] = scales
+        else:
+            self.codes[rows] = binarize(values)
+
+    def candidates(self, query: np.ndarray, count: int, exclude=()) -> np.ndarray:
+        """Rows of the `count` best approximate matches (unordered)."""
+        if self.mode == "int8":
+            # Higher is better; negate so both modes select the smallest values
+            keys = -int8_scores(self.codes, self.scales, query)
+        else:
+            keys = hamming_distances(self.codes, binarize(query[None, :])[0]).astype(np.float32)
+        if len(exclude):
+            keys[list(exclude)] = np.inf
+
+        count = min(count, len(keys) - len(exclude))
+        if count <= 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.argpartition(keys, count - 1)[:count]
+
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.mode == "int8" else 0)
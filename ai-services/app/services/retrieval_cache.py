@@ -0,0 +1,112 @@
+import time
+import threading
+from collections import OrderedDict
+from app.config import RagSettings
+
+
+class LRUCache:
+    """Size-bounded mapping that drops the least recently used key first."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop_where(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class TTLCache(LRUCache):
+    """LRU cache whose entries also expire `ttl` seconds after being written."""
+
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__(max_size)
+        self.ttl = ttl
+
+    def get(self, key):
+        entry = super().get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            with self._lock:
+                self._data.pop(key, None)
+                # Count the stale read as a miss, not a hit
+                self.hits -= 1
+                self.misses += 1
+            return None
+        return value
+
+    def set(self, key, value):
+        super().set(key, (time.monotonic() + self.ttl, value))
+
+
+class RetrievalCache:
+    """
+    Two-level cache in front of retrieve():
+    1. query text -> query vector (LRU, skips FastEmbed)
+    2. (user_id, filename, k, query) -> top-k chunk texts (TTL, skips the vector store)
+    Level 2 entries for a document are dropped whenever it is re-ingested or deleted.
+    """
+
+    def __init__(self, vector_size: int, result_size: int, result_ttl: float):
+        self.query_vectors = LRUCache(vector_size)
+        self.results = TTLCache(result_size, result_ttl)
+
+    def get_vector(self, query: str):
+        return self.query_vectors.get(query)
+
+    def set_vector(self, query: str, vector):
+        self.query_vectors.set(query, vector)
+
+    def get_results(self, user_id: str, filename: str, query: str, k: int):
+        return self.results.get((user_id, filename, k, query))
+
+    def set_results(self, user_id: str, filename: str, query: str, k: int, chunks: list):
+        self.results.set((user_id, filename, k, query), chunks)
+
+    def invalidate_document(self, user_id: str, filename: str):
+        self.results.pop_where(lambda key: key[0] == user_id and key[1] == filename)
+
+    def stats(self) -> dict:
+        return {
+            "query_vectors": self.query_vectors.stats(),
+            "results": self.results.stats()
+        }
+
+
+retrieval_cache = RetrievalCache(
+    RagSettings.QUERY_VECTOR_CACHE_SIZE,
+    RagSettings.RESULT_CACHE_SIZE,
+    RagSettings.RESULT_CACHE_TTL_SECONDS
+)
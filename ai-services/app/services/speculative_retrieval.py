@@ -0,0 +1,155 @@
+import re
+import time
+import asyncio
+from app.config import RagSettings
+from app.services.micro_batcher import Histogram
+
+# Words that make a message lean on the conversation before it
+_FOLLOW_UP = re.compile(
+    r"^(and|so|but|why|how about|what about)\b"
+    r"|\b(it|its|this|that|these|those|they|them|their|he|she|him|her|his"
+    r"|above|previous|earlier|again|more|else|same|also|one|ones)\b",
+    re.IGNORECASE
+)
+
+
+def is_standalone(message: str) -> bool:
+    """True if the message reads as a complete question on its own."""
+    return len(message.split()) >= 4 and not _FOLLOW_UP.search(message)
+
+
+def chunk_overlap(a: list, b: list, k: int = 3) -> float:
+    """Share of the top-k chunks (the ones put in the prompt) both results agree on."""
+    a, b = set(a[:k]), set(b[:k])
+    if not a and not b:
+        return 1.0
+    return len(a & b) / max(len(a), len(b))
+
+
+class Speculation:
+    """Retrieval for the raw message, running while /chat does everything else."""
+
+    def __init__(self, retrieval):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.task = asyncio.create_task(retrieval)
+        self.task.add_done_callback(self._done)
+
+    def _done(self, task):
+        self.finished = time.perf_counter()
+        if not task.cancelled():
+            task.exception()  # retrieved here; resolve() falls back to a normal search
+
+    def cancel(self):
+        self.task.cancel()
+
+
+class SpeculativeRetriever:
+    """
+    /chat starts retrieving the raw message as soon as the request arrives,
+    in parallel with the usage check, the history fetch and the rephrase call.
+    - No history (search query = raw message): the speculative result is used
+      as is; the retrieval time overlapped with the rest is saved.
+    - With `skip_rephrase`, a standalone follow-up (no pronouns or references
+      to earlier turns) skips the rephrase LLM call and uses the speculative
+      result too, saving the rephrase round trip as well.
+    - Otherwise the rephrased query is searched normally and its result is
+      used; nothing is saved. If the speculative search has finished by then,
+      the two are compared: they "agree" when their top chunks overlap by at
+      least `min_overlap`. Watch the agreement rate with `skip_rephrase` off
+      before turning it on.
+    """
+
+    def __init__(self, enabled: bool, min_overlap: float, skip_rephrase: bool):
+        self.enabled = enabled
+        self.min_overlap = min_overlap
+        self.skip_rephrase = skip_rephrase
+
+        self.outcomes = {"reused": 0, "skipped_rephrase": 0, "agreed": 0, "differed": 0, "failed": 0}
+        self.saved_ms = Histogram((10, 25, 50, 100, 250, 500, 1000, 2000))
+        self.overlap = Histogram((0, 0.34, 0.67, 1.0))
+        self.rephrase_ms = Histogram((250, 500, 1000, 2000, 4000))
+
+    def start(self, retrieval) -> Speculation | None:
+        if not self.enabled:
+            retrieval.close()
+            return None
+        return Speculation(retrieval)
+
+    def can_skip_rephrase(self, speculation: Speculation | None, message: str) -> bool:
+        return bool(speculation) and self.skip_rephrase and is_standalone(message)
+
+    def observe_rephrase(self, elapsed_ms: float):
+        self.rephrase_ms.observe(elapsed_ms)
+
+    async def resolve(self, speculation: Speculation | None, search_query: str, fetch,
+                      rephrased: bool = False, skipped_rephrase: bool = False) -> list:
+        """
+        Chunks for `search_query`; `fetch(query)` is the normal retrieval.
+        `rephrased`: the query came from the rephrase call (else it is the raw
+        message); `skipped_rephrase`: the rephrase call was skipped for it.
+        """
+        if speculation is None:
+            return await fetch(search_query)
+
+        if rephrased:
+            # The speculative search was for the raw message: search the rephrased query
+            try:
+                fresh = await fetch(search_query)
+            except Exception:
+                speculation.cancel()
+                raise
+            self._compare(speculation, fresh)
+            return fresh
+
+        resolving = time.perf_counter()
+        try:
+            speculative = await speculation.task
+        except Exception as e:
+            print(f"Speculative retrieval failed ({e}), searching normally")
+            self.outcomes["failed"] += 1
+            return await fetch(search_query)
+
+        # A sequential search would only have started now
+        saved_ms = (min(speculation.finished, resolving) - speculation.started) * 1000
+        if skipped_rephrase:
+            self.outcomes["skipped_rephrase"] += 1
+            # ...and would have waited for a rephrase round trip first (average so far)
+            if self.rephrase_ms.total:
+                saved_ms += self.rephrase_ms.sum / self.rephrase_ms.total
+        else:
+            self.outcomes["reused"] += 1
+        self.saved_ms.observe(saved_ms)
+        return speculative
+
+    def _compare(self, speculation: Speculation, fresh: list):
+        """Records whether the finished speculative search agreed with the rephrased one."""
+        task = speculation.task
+        if not task.done():
+            # Not waited for: it would only delay the answer
+            speculation.cancel()
+            return
+        if task.cancelled() or task.exception():
+            return
+        overlap = chunk_overlap(task.result(), fresh)
+        self.overlap.observe(overlap)
+        self.outcomes["agreed" if overlap >= self.min_overlap else "differed"] += 1
+
+    def stats(self) -> dict:
+        checked = self.outcomes["agreed"] + self.outcomes["differed"]
+        return {
+            "enabled": self.enabled,
+            "skip_rephrase": self.skip_rephrase,
+            "outcomes": dict(self.outcomes),
+            "agreement_rate": round(self.outcomes["agreed"] / checked, 3) if checked else None,
+            "saved_ms": self.saved_ms.snapshot(),
+            "overlap": self.overlap.snapshot(),
+            "rephrase_ms": self.rephrase_ms.snapshot()
+        }
+
+
+speculative_retriever = SpeculativeRetriever(
+    RagSettings.SPECULATIVE_RETRIEVAL,
+    RagSettings.SPECULATIVE_MIN_OVERLAP,
+    RagSettings.SPECULATIVE_SKIP_REPHRASE
+)
@@ -0,0 +1,102 @@
+import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from app.config import RagSettings
+
+
+class UpsertWriter:
+    """
+    Pipelined vector-store upserts for one ingestion.
+    - Up to `max_in_flight` batches are written at the same time, each on its
+      own thread (and pooled connection) of a small executor.
+    - A failed batch is retried with exponential backoff and full jitter;
+      upserts are keyed by vector id, so a retried batch is idempotent.
+    - submit() waits while `max_in_flight` batches are outstanding, so a slow
+      store pushes back on the embedding stage instead of buffering vectors.
+    - on_commit(marker) is awaited for each batch IN SUBMISSION ORDER once it
+      and every batch before it are stored (safe to checkpoint).
+    """
+
+    def __init__(self, store, max_in_flight: int = None, max_retries: int = None,
+                 base_delay: float = None, on_commit=None):
+        self.store = store
+        self.max_in_flight = max_in_flight or RagSettings.UPSERT_MAX_IN_FLIGHT
+        self.max_retries = RagSettings.UPSERT_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = RagSettings.UPSERT_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.on_commit = on_commit
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="upsert")
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._tasks = []
+        self._next_seq = 0        # next batch number to hand out
+        self._committed_seq = 0   # batches before this number are all stored
+        self._finished = {}       # seq -> marker, stored but not yet committed
+        self._commit_lock = asyncio.Lock()
+        self._error = None
+
+        self.batches = 0
+        self.vectors = 0
+        self.retries = 0
+
+    async def submit(self, vectors: list, marker=None):
+        if self._error:
+            raise self._error
+        await self._slots.acquire()
+        seq = self._next_seq
+        self._next_seq += 1
+        self._tasks.append(asyncio.create_task(self._write(seq, vectors, marker)))
+
+    async def _write(self, seq: int, vectors: list, marker):
+        loop = asyncio.get_running_loop()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    await loop.run_in_executor(self._pool, self.store.upsert, vectors)
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        raise
+                    self.retries += 1
+                    delay = random.uniform(0, self.base_delay * 2 ** attempt)
+                    print(f"Upsert of batch {seq} failed ({e}), retry {attempt + 1} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+            self.batches += 1
+            self.vectors += len(vectors)
+        except Exception as e:
+            self._error = self._error or e
+            raise
+        finally:
+            self._slots.release()
+
+        async with self._commit_lock:
+            self._finished[seq] = marker
+            while self._committed_seq in self._finished:
+                committed = self._finished.pop(self._committed_seq)
+                self._committed_seq += 1
+                if self.on_commit:
+                    await self.on_commit(committed)
+
+    async def drain(self):
+        """Waits for every submitted batch; raises the first failure."""
+        try:
+            results = await asyncio.gather(*self._tasks, return_exceptions=True)
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                raise errors[0]
+        finally:
+            self._pool.shutdown(wait=False)
+
+    async def cancel(self):
+        """
+        Stops the ingestion's writes: queued batches are dropped, and it returns
+        only once no upsert is still running, so the caller can clean up safely.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # A batch already handed to a thread cannot be interrupted: wait for it
+        await asyncio.to_thread(self._pool.shutdown, wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "vectors": self.vectors, "retries": self.retries}
+
@@ -0,0 +1,446 @@
+import os
+import json
+import time
+import random
+import shutil
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+from app.config import RagSettings
+from app.services.quantization import QuantizedCodes, QUANTIZATION_MODES
+
+
+def document_scope(user_id: str = None, filename: str = None, storage_key: str = None) -> dict:
+    """
+    Metadata filter selecting ONE stored document.
+    Stored documents are shared by every owner of the same PDF (see
+    document_registry); documents ingested before dedup are still scoped by
+    (user_id, filename).
+    """
+    if storage_key:
+        return {"storage_key": storage_key}
+    return {"user_id": user_id, "filename": filename}
+
+
+def scope_of(metadata: dict) -> dict:
+    return document_scope(metadata.get("user_id"), metadata.get("filename"), metadata.get("storage_key"))
+
+
+def scope_key(scope: dict) -> str:
+    """Stable on-disk key for a scope (legacy keys are unchanged)."""
+    if scope.get("storage_key"):
+        raw = f"storage\x00{scope['storage_key']}"
+    else:
+        raw = f"{scope['user_id']}\x00{scope['filename']}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class VectorStore(ABC):
+    """
+    The small surface the RAG pipeline needs from a vector database.
+    Vectors are plain dicts: {"id": str, "values": [float], "metadata": dict}
+    and every vector's metadata contains its document scope (see document_scope).
+    """
+
+    @abstractmethod
+    def upsert(self, vectors: list):
+        ...
+
+    @abstractmethod
+    def query(self, vector, scope: dict, top_k: int = 3) -> list:
+        """Returns matches as [{"id", "score", "metadata"}], best first."""
+
+    @abstractmethod
+    def query_many(self, vector, scopes: list, top_k: int = 5) -> list:
+        """Best `top_k` matches across several documents, best first."""
+
+    @abstractmethod
+    def delete_ids(self, scope: dict, ids: list):
+        """Deletes single vectors of one document (incremental re-ingestion)."""
+
+    @abstractmethod
+    def delete_document(self, scope: dict):
+        ...
+
+
+# --- Pinecone (remote) ---
+class PineconeVectorStore(VectorStore):
+    def __init__(self, index_name: str, api_key: str = None):
+        from pinecone import Pinecone
+
+        self.pc = Pinecone(api_key=api_key or os.getenv("PINECONE_API_KEY"))
+        # Enough pooled connections for every upsert batch in flight
+        self.index = self.pc.Index(index_name, pool_threads=max(1, RagSettings.UPSERT_MAX_IN_FLIGHT))
+
+    def upsert(self, vectors):
+        self.index.upsert(vectors=vectors)
+
+    def query(self, vector, scope, top_k=3):
+        results = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=True,
+            filter=scope
+        )
+        return [
+            {"id": m["id"], "score": m["score"], "metadata": m["metadata"]}
+            for m in results["matches"]
+        ]
+
+    def query_many(self, vector, scopes, top_k=5):
+        # One request whatever the number of documents: OR the per-document filters
+        storage_keys = [s["storage_key"] for s in scopes if s.get("storage_key")]
+        legacy = [s for s in scopes if not s.get("storage_key")]
+        filters = []
+        if storage_keys:
+            filters.append({"storage_key": {"$in": storage_keys}})
+        for user_id in {s["user_id"] for s in legacy}:
+            filters.append({
+                "user_id": user_id,
+                "filename": {"$in": [s["filename"] for s in legacy if s["user_id"] == user_id]}
+            })
+        if not filters:
+            return []
+        return self.query(vector, filters[0] if len(filters) == 1 else {"$or": filters}, top_k)
+
+    def delete_ids(self, scope, ids):
+        # Pinecone accepts up to 1000 ids per delete call
+        for i in range(0, len(ids), 1000):
+            self.index.delete(ids=ids[i:i + 1000])
+
+    def delete_document(self, scope):
+        self.index.delete(filter=scope)
+
+
+# --- Local (in-process, memory-mapped) ---
+class _DocumentIndex:
+    """
+    Exact cosine index for ONE (user, document) pair.
+    - vectors.f32 : normalized float32 rows, appended, opened as a read-only memmap
+    - meta.jsonl  : append-only {"row", "id", "metadata"} log (last entry per row wins,
+                    an id of null marks a deleted row, which a later add may reuse)
+    Nothing is rebuilt on restart: the log is replayed and the matrix is mapped.
+
+    With quantization ("int8" or "binary") the rows are also kept in memory as
+    compact codes: a quantized scan picks top_k * rerank_factor candidates and
+    only those rows are read from the float32 file and re-scored exactly.
+    """
+
+    def __init__(self, path: str, quantization: str = "none", rerank_factor: int = 8):
+        self.path = path
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.meta_path = os.path.join(path, "meta.jsonl")
+        self.lock = threading.Lock()
+        self.dim = None
+        self.row_ids = []      # row -> vector id
+        self.row_meta = []     # row -> metadata
+        self.id_to_row = {}
+        self.free_rows = set()
+        self._matrix = None
+        self._codes = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.meta_path):
+            return
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                row = entry["row"]
+                self.dim = entry["dim"]
+                if row == len(self.row_ids):
+                    self.row_ids.append(entry["id"])
+                    self.row_meta.append(entry["metadata"])
+                else:
+                    if self.id_to_row.get(self.row_ids[row]) == row:
+                        del self.id_to_row[self.row_ids[row]]
+                    self.row_ids[row] = entry["id"]
+                    self.row_meta[row] = entry["metadata"]
+                if entry["id"] is None:
+                    self.free_rows.add(row)
+                else:
+                    self.free_rows.discard(row)
+                    self.id_to_row[entry["id"]] = row
+
+    def _matrix_view(self):
+        if self._matrix is None and self.row_ids:
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r",
+                shape=(len(self.row_ids), self.dim)
+            )
+        return self._matrix
+
+    def _codes_view(self):
+        """Quantized codes, built from the float32 file on first use."""
+        if self._codes is None and self.quantization != "none" and self.row_ids:
+            matrix = self._matrix_view()
+            codes = QuantizedCodes(self.quantization, self.dim)
+            for start in range(0, len(matrix), 8192):
+                block = np.asarray(matrix[start:start + 8192])
+                codes.set_rows(np.arange(start, start + len(block)), block)
+            self._codes = codes
+        return self._codes
+
+    def add(self, vectors: list):
+        with self.lock:
+            os.makedirs(self.path, exist_ok=True)
+            values = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+            norms = np.linalg.norm(values, axis=1, keepdims=True)
+            values = values / np.maximum(norms, 1e-12)
+
+            if self.dim is None:
+                self.dim = values.shape[1]
+            elif values.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {values.shape[1]} != index dimension {self.dim}")
+
+            # Drop the current mapping before touching the file
+            self._matrix = None
+
+            log_lines = []
+            written_rows = []
+            with open(self.vectors_path, "r+b" if os.path.exists(self.vectors_path) else "w+b") as f:
+                for vec, values_row in zip(vectors, values):
+                    row = self.id_to_row.get(vec["id"])
+                    if row is None and self.free_rows:
+                        row = self.free_rows.pop()
+                        self.row_ids[row] = vec["id"]
+                        self.row_meta[row] = vec.get("metadata", {})
+                        self.id_to_row[vec["id"]] = row
+                    elif row is None:
+                        row = len(self.row_ids)
+                        self.row_ids.append(vec["id"])
+                        self.row_meta.append(vec.get("metadata", {}))
+                        self.id_to_row[vec["id"]] = row
+                    else:
+                        self.row_meta[row] = vec.get("metadata", {})
+                    f.seek(row * self.dim * 4)
+                    f.write(values_row.tobytes())
+                    written_rows.append(row)
+                    log_lines.append(json.dumps({
+                        "row": row, "dim": self.dim, "id": vec["id"], "metadata": self.row_meta[row]
+                    }))
+
+            # Vectors are written before the log, so a replayed log never points past the file
+            with open(self.meta_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(log_lines) + "\n")
+
+            if self._codes is not None:
+                self._codes.set_rows(written_rows, values)
+
+    def remove(self, ids: list):
+        with self.lock:
+            log_lines = []
+            for vector_id in ids:
+                row = self.id_to_row.pop(vector_id, None)
+                if row is None:
+                    continue
+                self.row_ids[row] = None
+                self.row_meta[row] = None
+                self.free_rows.add(row)
+                log_lines.append(json.dumps({"row": row, "dim": self.dim, "id": None, "metadata": None}))
+            if log_lines:
+                with open(self.meta_path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(log_lines) + "\n")
+
+    def search(self, query, top_k: int) -> list:
+        with self.lock:
+            matrix = self._matrix_view()
+            if matrix is None:
+                return []
+            q = np.asarray(query, dtype=np.float32)
+            q = q / max(float(np.linalg.norm(q)), 1e-12)
+
+            live_rows = len(self.row_ids) - len(self.free_rows)
+            if self.quantization != "none" and top_k * self.rerank_factor < live_rows:
+                return self._search_quantized(matrix, q, top_k)
+
+            scores = matrix @ q
+            if self.free_rows:
+                scores[list(self.free_rows)] = -np.inf
+
+            k = min(top_k, len(scores) - len(self.free_rows))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {"id": self.row_ids[r], "score": float(scores[r]), "metadata": self.row_meta[r]}
+                for r in top
+            ]
+
+
+    def _search_quantized(self, matrix, q, top_k: int) -> list:
+        rows = np.sort(self._codes_view().candidates(q, top_k * self.rerank_factor, self.free_rows))
+        # Only the candidate rows are read from the float32 file
+        scores = np.asarray(matrix[rows]) @ q
+        best = np.argsort(-scores)[:top_k]
+        return [
+            {"id": self.row_ids[rows[i]], "score": float(scores[i]), "metadata": self.row_meta[rows[i]]}
+            for i in best
+        ]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Keeps one exact index per document scope under `root_dir`.
+    Queries never leave the process, so there is no network round trip.
+    """
+
+    def __init__(self, root_dir: str, quantization: str = "none", rerank_factor: int = 8):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown LOCAL_INDEX_QUANTIZATION: {quantization}")
+        self.root_dir = root_dir
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        os.makedirs(root_dir, exist_ok=True)
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _doc_path(self, scope):
+        return os.path.join(self.root_dir, scope_key(scope))
+
+    def _get_index(self, scope) -> _DocumentIndex:
+        path = self._doc_path(scope)
+        with self._lock:
+            index = self._indexes.get(path)
+            if index is None:
+                index = _DocumentIndex(path, self.quantization, self.rerank_factor)
+                self._indexes[path] = index
+            return index
+
+    def upsert(self, vectors):
+        groups = {}
+        for vec in vectors:
+            scope = scope_of(vec.get("metadata", {}))
+            groups.setdefault(scope_key(scope), (scope, []))[1].append(vec)
+
+        for scope, group in groups.values():
+            self._get_index(scope).add(group)
+
+    def query(self, vector, scope, top_k=3):
+        if not os.path.isdir(self._doc_path(scope)):
+            return []
+        return self._get_index(scope).search(vector, top_k)
+
+    def query_many(self, vector, scopes, top_k=5):
+        # Exact per-document top_k, so the merged top_k is exact too
+        matches = []
+        for scope in scopes:
+            matches.extend(self.query(vector, scope, top_k))
+        matches.sort(key=lambda m: m["score"], reverse=True)
+        return matches[:top_k]
+
+    def delete_ids(self, scope, ids):
+        if os.path.isdir(self._doc_path(scope)):
+            self._get_index(scope).remove(ids)
+
+    def delete_document(self, scope):
+        path = self._doc_path(scope)
+        with self._lock:
+            index = self._indexes.pop(path, None)
+        if index:
+            with index.lock:
+                index._matrix = None
+                shutil.rmtree(path, ignore_errors=True)
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# --- In-memory stand-in (offline benchmarks and development) ---
+class MemoryVectorStore(VectorStore):
+    """
+    Pinecone stand-in that keeps everything in a dict.
+    `latency_ms` is slept per call (releasing the GIL, like a network round trip)
+    and `failure_rate` makes calls fail with ConnectionError before they apply,
+    so upsert concurrency and retries can be benchmarked without an API key.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, failure_rate: float = 0.0, seed: int = None):
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._vectors = {}     # id -> (unit float32 vector, metadata)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def _round_trip(self):
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.failure_rate
+            self.failures += failed
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise ConnectionError("simulated transient vector store failure")
+
+    @staticmethod
+    def _matches(metadata, scope):
+        return all(metadata.get(key) == value for key, value in scope.items())
+
+    def upsert(self, vectors):
+        self._round_trip()
+        with self._lock:
+            for vec in vectors:
+                values = np.asarray(vec["values"], dtype=np.float32)
+                values = values / max(float(np.linalg.norm(values)), 1e-12)
+                self._vectors[vec["id"]] = (values, vec.get("metadata", {}))
+
+    def query(self, vector, scope, top_k=3):
+        return self.query_many(vector, [scope], top_k)
+
+    def query_many(self, vector, scopes, top_k=5):
+        self._round_trip()
+        q = np.asarray(vector, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        with self._lock:
+            hits = [
+                {"id": vector_id, "score": float(values @ q), "metadata": metadata}
+                for vector_id, (values, metadata) in self._vectors.items()
+                if any(self._matches(metadata, scope) for scope in scopes)
+            ]
+        hits.sort(key=lambda m: m["score"], reverse=True)
+        return hits[:top_k]
+
+    def delete_ids(self, scope, ids):
+        self._round_trip()
+        with self._lock:
+            for vector_id in ids:
+                self._vectors.pop(vector_id, None)
+
+    def delete_document(self, scope):
+        self._round_trip()
+        with self._lock:
+            for vector_id in [i for i, (_, m) in self._vectors.items() if self._matches(m, scope)]:
+                del self._vectors[vector_id]
+
+    def __len__(self):
+        return len(self._vectors)
+
+
+def create_vector_store(backend: str = None) -> VectorStore:
+    backend = (backend or RagSettings.VECTOR_BACKEND).lower()
+
+    if backend == "local":
+        print(f"Using local vector index at: {RagSettings.LOCAL_INDEX_DIR} "
+              f"(quantization: {RagSettings.LOCAL_INDEX_QUANTIZATION})")
+        return LocalVectorStore(
+            RagSettings.LOCAL_INDEX_DIR,
+            RagSettings.LOCAL_INDEX_QUANTIZATION,
+            RagSettings.QUANTIZED_RERANK_FACTOR
+        )
+    if backend == "memory":
+        print("Using in-memory vector store (nothing is persisted)")
+        return MemoryVectorStore()
+    if backend == "pinecone":
+        return PineconeVectorStore(RagSettings.PINECONE_INDEX_NAME)
+
+    raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")
+
+
+vector_store = create_vector_store()
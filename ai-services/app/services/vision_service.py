@@ -1,50 +1,290 @@
-import os
-from openai import AzureOpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Initialize Azure Client
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("OPENAI_API_VERSION"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-)
-
-deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT")
-
-def analyze_chat_image(base64_image: str) -> str:
-    """
-    Takes a raw base64 string (from frontend) and gets a description from Azure OpenAI.
-    """
-    try:
-        # Clean the Base64 String
-        # The frontend might sends "data:image/jpeg;base64,..." - we need to remove that header.
-        if "," in base64_image:
-            base64_image = base64_image.split(",")[1]
-
-        #  Call Azure OpenAI
-        response = client.chat.completions.create(
-            model=deployment_name,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Describe this educational image in detail. If it contains text, transcribe it. If it is a diagram, describe the components and their relationships."},
-                        {
-                            "type": "image_url",
-                            "image_url": { 
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=300 
-        )
-
-        return response.choices[0].message.content
-
-    except Exception as e:
-        print(f" Vision Error: {e}")
-        return "Error analyzing image. Please try again."
\ No newline at end of file
+import io
+import os
+import time
+import base64
+import asyncio
+import binascii
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import numpy as np
+from PIL import Image, ImageOps
+from dotenv import load_dotenv
+from app.config import RagSettings
+
+load_dotenv()
+
+DESCRIBE_PROMPT = (
+    "Describe this educational image in detail. If it contains text, transcribe it. "
+    "If it is a diagram, describe the components and their relationships."
+)
+
+HASH_SIZE = 16       # 16x16 = 256-bit perceptual hash
+HASH_SAMPLE = 64     # grayscale thumbnail the DCT runs on
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+
+
+_DCT = _dct_matrix(HASH_SAMPLE)
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """
+    DCT perceptual hash: one bit per low-frequency coefficient, set if it is
+    above the median. Re-encoding, rescaling or slight recolouring of the
+    same picture changes only a few bits.
+    """
+    gray = image.convert("L").resize((HASH_SAMPLE, HASH_SAMPLE), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float32)
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].flatten()
+    bits = low > np.median(low[1:])  # DC term left out of the median
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+class PreparedImage:
+    """A chat image, downscaled and recompressed for the vision model."""
+
+    def __init__(self, jpeg: bytes, phash: int, size: tuple, original_bytes: int):
+        self.jpeg = jpeg
+        self.phash = phash
+        self.size = size
+        self.original_bytes = original_bytes
+
+    @property
+    def base64(self) -> str:
+        return base64.b64encode(self.jpeg).decode()
+
+
+def prepare_image(base64_image: str, max_side: int, quality: int) -> PreparedImage:
+    """
+    Decodes a (data URL or raw) base64 image, fits it into max_side x max_side
+    and recompresses it as JPEG. Raises ValueError if it is not an image.
+    """
+    # The frontend sends "data:image/jpeg;base64,..." - drop the header
+    if "," in base64_image:
+        base64_image = base64_image.split(",", 1)[1]
+    try:
+        raw = base64.b64decode(base64_image)
+        image = Image.open(io.BytesIO(raw))
+        # JPEG: let the decoder scale down by 1/2, 1/4 or 1/8 while decoding
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+    except (binascii.Error, OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Not a readable image: {e}")
+
+    if image.mode in ("RGBA", "LA", "P"):
+        # Screenshots with transparency: flatten on white like a viewer would
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    else:
+        image = image.convert("RGB")
+
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=quality, optimize=True)
+    return PreparedImage(out.getvalue(), perceptual_hash(image), image.size, len(raw))
+
+
+# --- Vision clients ---
+class VisionClient(ABC):
+    """Describes one JPEG (base64) image; blocking, run off the event loop."""
+
+    @abstractmethod
+    def describe(self, jpeg_base64: str) -> str:
+        ...
+
+
+class AzureVisionClient(VisionClient):
+    def __init__(self, deployment: str, timeout: float):
+        from openai import AzureOpenAI
+
+        self.deployment = deployment
+        self.client = AzureOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            api_version=os.getenv("OPENAI_API_VERSION"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            # The HTTP call gives up too, not just the request waiting on it
+            timeout=timeout,
+            max_retries=0
+        )
+
+    def describe(self, jpeg_base64):
+        response = self.client.chat.completions.create(
+            model=self.deployment,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": DESCRIBE_PROMPT},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{jpeg_base64}"
+                            }
+                        }
+                    ]
+                }
+            ],
+            max_tokens=300
+        )
+        return response.choices[0].message.content
+
+
+class LocalVisionClient(VisionClient):
+    """
+    Stand-in for tests and local runs: no network, no credentials. Describes
+    the image by its size and average colour; `delay` simulates the remote
+    round trip.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def describe(self, jpeg_base64):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        image = Image.open(io.BytesIO(base64.b64decode(jpeg_base64))).convert("RGB")
+        r, g, b = (int(c) for c in np.asarray(image, dtype=np.float32).mean(axis=(0, 1)))
+        return f"An image of {image.width}x{image.height} pixels, average colour rgb({r}, {g}, {b})."
+
+
+# --- Pipeline ---
+class VisionPipeline:
+    """
+    /chat image descriptions:
+    - The upload is decoded, downscaled to `max_side` and recompressed (in a
+      thread) before it is sent, so the vision call uploads and reads a
+      fraction of the pixels.
+    - Descriptions are cached by perceptual hash (LRU, `cache_size`). With
+      `max_distance` 0 only an identical hash reuses a description; a higher
+      value also matches hashes that many bits apart (re-encoded or rescaled
+      copies), at the risk of answering for a slightly different image such
+      as an edited slide. Concurrent requests for the same image share one
+      remote call.
+    - The remote call runs in a thread with a `timeout`; failures raise and
+      are never cached.
+    """
+
+    def __init__(self, client: VisionClient, max_side: int, quality: int, timeout: float,
+                 cache_size: int, max_distance: int):
+        self.client = client
+        self.max_side = max_side
+        self.quality = quality
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.max_distance = max_distance
+
+        self._cache = OrderedDict()  # phash -> description, least recently used first
+        self._in_flight = {}         # phash -> task
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.remote_calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_sent = 0
+
+    def _lookup(self, phash: int) -> str | None:
+        with self._lock:
+            if phash in self._cache:
+                self._cache.move_to_end(phash)
+                self.exact_hits += 1
+                return self._cache[phash]
+            if self.max_distance:
+                for cached, description in self._cache.items():
+                    if (cached ^ phash).bit_count() <= self.max_distance:
+                        self._cache.move_to_end(cached)
+                        self.near_hits += 1
+                        return description
+        return None
+
+    def _store(self, phash: int, description: str):
+        with self._lock:
+            self._cache[phash] = description
+            self._cache.move_to_end(phash)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    async def _call_remote(self, prepared: PreparedImage) -> str:
+        self.remote_calls += 1
+        self.bytes_sent += len(prepared.jpeg)
+        try:
+            description = await asyncio.wait_for(
+                asyncio.to_thread(self.client.describe, prepared.base64), self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise TimeoutError(f"Vision call timed out after {self.timeout}s")
+        except Exception:
+            self.errors += 1
+            raise
+        if not description:
+            self.errors += 1
+            raise ValueError("Vision model returned no description")
+        self._store(prepared.phash, description)
+        return description
+
+    async def describe(self, base64_image: str) -> str:
+        self.requests += 1
+        prepared = await asyncio.to_thread(prepare_image, base64_image, self.max_side, self.quality)
+        self.bytes_in += prepared.original_bytes
+
+        cached = self._lookup(prepared.phash)
+        if cached is not None:
+            return cached
+
+        task = self._in_flight.get(prepared.phash)
+        if task is None:
+            task = asyncio.ensure_future(self._call_remote(prepared))
+            self._in_flight[prepared.phash] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(prepared.phash, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.near_hits
+        return {
+            "backend": type(self.client).__name__,
+            "requests": self.requests,
+            "cached": len(self._cache),
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "hit_rate": round(hits / self.requests, 4) if self.requests else 0.0,
+            "remote_calls": self.remote_calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "bytes_in": self.bytes_in,
+            "bytes_sent": self.bytes_sent
+        }
+
+
+def create_vision_client(backend: str = None) -> VisionClient:
+    backend = (backend or RagSettings.VISION_BACKEND).lower()
+
+    if backend == "local":
+        print("Using local stand-in vision client (no remote calls)")
+        return LocalVisionClient()
+    if backend == "azure":
+        return AzureVisionClient(os.getenv("AZURE_OPENAI_DEPLOYMENT"), RagSettings.VISION_TIMEOUT_SECONDS)
+
+    raise ValueError(f"Unknown VISION_BACKEND: {backend}")
+
+
+vision_pipeline = VisionPipeline(
+    create_vision_client(),
+    RagSettings.VISION_MAX_SIDE,
+    RagSettings.VISION_JPEG_QUALITY,
+    RagSettings.VISION_TIMEOUT_SECONDS,
+    RagSettings.VISION_CACHE_SIZE,
+    RagSettings.VISION_HASH_DISTANCE
+)
\ No newline at end of file
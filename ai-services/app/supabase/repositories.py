@@ -0,0 +1,235 @@
+import os
+import json
+import base64
+import asyncio
+
+_client = None
+_client_lock = asyncio.Lock()
+
+
+async def get_client():
+    """The process-wide async Supabase client (one pooled HTTP connection set)."""
+    global _client
+    if _client is None:
+        async with _client_lock:
+            if _client is None:
+                from supabase import acreate_client
+
+                _client = await acreate_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    return _client
+
+
+def encode_cursor(row: dict) -> str:
+    """Opaque keyset cursor (base64url JSON) pointing at a chat_history row."""
+    raw = json.dumps({"created_at": row["created_at"], "id": row["id"]}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """The {"created_at", "id"} position of a cursor; ValueError if it is not one."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+        return {"created_at": str(position["created_at"]), "id": position["id"]}
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+class Repository:
+    """Async access to one Supabase table; every call awaits instead of blocking the event loop."""
+    table_name = None
+
+    async def table(self):
+        return (await get_client()).table(self.table_name)
+
+
+class ChatHistoryRepository(Repository):
+    table_name = "chat_history"
+
+    async def add(self, user_id: str, filename: str, role: str, content: str):
+        await (await self.table()).insert({
+            "user_id": user_id,
+            "filename": filename,
+            "role": role,
+            "content": content
+        }).execute()
+
+    async def recent(self, user_id: str, filename: str, limit: int) -> list:
+        """The last `limit` messages, oldest first."""
+        response = await (await self.table())\
+            .select("role, content")\
+            .eq("user_id", user_id)\
+            .eq("filename", filename)\
+            .order("created_at", desc=True)\
+            .limit(limit)\
+            .execute()
+        return response.data[::-1]
+
+    async def page(self, user_id: str, filename: str, limit: int, before: dict = None) -> list:
+        """
+        Up to `limit` messages older than the `before` row ({"created_at", "id"}),
+        newest first. Keyset pagination: served by the (user_id, filename,
+        created_at, id) index, as fast on page 100 as on page 1.
+        """
+        query = (await self.table())\
+            .select("id, role, content, created_at")\
+            .eq("user_id", user_id)\
+            .eq("filename", filename)
+        if before:
+            # Timestamps contain PostgREST's reserved characters: quote them
+            created_at, row_id = before["created_at"], before["id"]
+            query = query.or_(
+                f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")'
+            )
+        response = await query\
+            .order("created_at", desc=True)\
+            .order("id", desc=True)\
+            .limit(limit)\
+            .execute()
+        return response.data
+
+    async def delete_for(self, user_id: str, filenames: list):
+        await (await self.table()).delete()\
+            .eq("user_id", user_id)\
+            .in_("filename", filenames)\
+            .execute()
+
+
+class DocumentRepository(Repository):
+    table_name = "documents"
+
+    async def filenames(self, user_id: str) -> list:
+        response = await (await self.table()).select("filename").eq("user_id", user_id).execute()
+        return [row["filename"] for row in response.data]
+
+    async def get(self, user_id: str, filename: str) -> dict | None:
+        """The user's reference to a document: {"content_hash", "storage_key"}."""
+        response = await (await self.table()).select("content_hash, storage_key")\
+            .eq("user_id", user_id)\
+            .eq("filename", filename)\
+            .limit(1)\
+            .execute()
+        return response.data[0] if response.data else None
+
+    async def for_user(self, user_id: str) -> list:
+        response = await (await self.table()).select("filename, content_hash, storage_key")\
+            .eq("user_id", user_id)\
+            .execute()
+        return response.data
+
+    # Linking, releasing and counting references to one storage_key are
+    # serialized by the database functions of migration 005
+    async def link(self, user_id: str, filename: str, content_hash: str) -> str | None:
+        response = await (await get_client()).rpc(
+            "link_document", {"p_user_id": user_id, "p_filename": filename, "p_content_hash": content_hash}
+        ).execute()
+        return response.data or None
+
+    async def release(self, user_id: str, filename: str) -> tuple:
+        """Deletes the user's reference; returns (storage_key, references left)."""
+        response = await (await get_client()).rpc(
+            "release_document", {"p_user_id": user_id, "p_filename": filename}
+        ).execute()
+        row = response.data[0] if response.data else {}
+        return row.get("storage_key"), row.get("remaining") or 0
+
+    async def count_storage_refs(self, storage_key: str) -> int:
+        response = await (await get_client()).rpc(
+            "storage_references", {"p_storage_key": storage_key}
+        ).execute()
+        return response.data or 0
+
+    async def add(self, row: dict):
+        await (await self.table()).insert(row).execute()
+
+    async def update(self, user_id: str, filename: str, fields: dict) -> list:
+        """Updates the user's reference; returns the updated rows (empty if there was none)."""
+        response = await (await self.table()).update(fields)\
+            .match({"user_id": user_id, "filename": filename})\
+            .execute()
+        return response.data
+
+
+class QuizResultRepository(Repository):
+    table_name = "quiz_results"
+
+    async def add(self, row: dict) -> dict:
+        response = await (await self.table()).insert(row).execute()
+        return response.data[0]
+
+    async def for_user(self, user_id: str, limit: int = None) -> list:
+        """The user's results, newest first."""
+        query = (await self.table())\
+            .select("*")\
+            .eq("user_id", user_id)\
+            .order("created_at", desc=True)
+        if limit:
+            query = query.limit(limit)
+        return (await query.execute()).data
+
+    async def ids_for(self, user_id: str, filename: str) -> list:
+        response = await (await self.table()).select("id")\
+            .match({"user_id": user_id, "filename": filename})\
+            .execute()
+        return [row["id"] for row in response.data]
+
+    async def delete_for(self, user_id: str, filename: str):
+        await (await self.table()).delete().match({"user_id": user_id, "filename": filename}).execute()
+
+
+class MistakeRepository(Repository):
+    table_name = "mistakes"
+
+    async def add_many(self, rows: list):
+        await (await self.table()).insert(rows).execute()
+
+    async def delete_for_quizzes(self, quiz_ids: list):
+        await (await self.table()).delete().in_("quiz_result_id", quiz_ids).execute()
+
+
+class StudyEventRepository(Repository):
+    table_name = "study_events"
+
+    async def add(self, event: dict) -> dict | None:
+        response = await (await self.table()).insert(event).execute()
+        return response.data[0] if response.data else None
+
+    async def for_user(self, user_id: str, start_date: str = None, end_date: str = None) -> list:
+        query = (await self.table()).select("*").eq("user_id", user_id).order("start_time")
+        if start_date:
+            query = query.gte("start_time", f"{start_date}T00:00:00Z")
+        if end_date:
+            query = query.lte("end_time", f"{end_date}T23:59:59Z")
+        return (await query.execute()).data
+
+
+class UserUsageRepository(Repository):
+    table_name = "user_usage"
+
+    async def get(self, user_id: str) -> dict | None:
+        response = await (await self.table()).select("*").eq("user_id", user_id).execute()
+        return response.data[0] if response.data else None
+
+    async def upsert(self, row: dict):
+        await (await self.table()).upsert(row).execute()
+
+    async def update(self, user_id: str, fields: dict):
+        await (await self.table()).update(fields).eq("user_id", user_id).execute()
+
+    async def release_upload(self, user_id: str, job_id: str) -> int | None:
+        """
+        Gives back the upload quota of a deleted book, once per deletion job
+        (release_upload_quota, migration 004). Returns the remaining count.
+        """
+        response = await (await get_client()).rpc(
+            "release_upload_quota", {"p_user_id": user_id, "p_job_id": job_id}
+        ).execute()
+        return response.data
+
+
+chat_history_repo = ChatHistoryRepository()
+documents_repo = DocumentRepository()
+quiz_results_repo = QuizResultRepository()
+mistakes_repo = MistakeRepository()
+study_events_repo = StudyEventRepository()
+user_usage_repo = UserUsageRepository()
@@ -0,0 +1,75 @@
+"""
+RecursiveCharacterTextSplitter vs. the offset-based SpanChunker.
+
+Run from ai-services/:
+    python -m benchmarks.bench_chunker --pages 800
+"""
+import gc
+import time
+import random
+import argparse
+import tracemalloc
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.services.chunker import chunk_documents
+from benchmarks.sample_pdf import WORDS
+
+
+def make_pages(pages: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    documents = []
+    for page in range(pages):
+        paragraphs = [
+            "\n".join(" ".join(rnd.choice(WORDS) for _ in range(12)) for _ in range(rnd.randint(3, 9)))
+            for _ in range(rnd.randint(3, 6))
+        ]
+        documents.append(Document(
+            page_content="\n\n".join(paragraphs),
+            metadata={"source": "bench.pdf", "page": page}
+        ))
+    return documents
+
+
+def measure(fn):
+    """Returns (result, seconds, peak MB while building, MB still held by the result)."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 1e6, retained / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=800)
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages)
+    total_chars = sum(len(p.page_content) for p in pages)
+    print(f"{args.pages} pages, {total_chars / 1e6:.1f} M characters")
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    reference, ref_s, ref_peak, ref_held = measure(lambda: splitter.split_documents(pages))
+    chunked, span_s, span_peak, span_held = measure(lambda: chunk_documents(pages, 1000, 200))
+
+    identical = len(reference) == len(chunked) and all(
+        a.page_content == b.page_content and a.metadata == b.metadata
+        for a, b in zip(reference, chunked)
+    )
+
+    print(f"{'':<32}{'time (s)':>10}{'MB/s':>10}{'peak MB':>10}{'held MB':>10}")
+    for name, seconds, peak, held in (
+        ("RecursiveCharacterTextSplitter", ref_s, ref_peak, ref_held),
+        ("SpanChunker", span_s, span_peak, span_held),
+    ):
+        print(f"{name:<32}{seconds:>10.3f}{total_chars / 1e6 / seconds:>10.1f}{peak:>10.1f}{held:>10.1f}")
+    print(f"chunks: {len(chunked)}, identical output: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Recall@k and query latency of the int8 / binary local index against exact float32 search.
+
+Run from ai-services/:
+    python -m benchmarks.bench_quantization --vectors 50000 --k 5
+"""
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+
+def make_vectors(n: int, dim: int, topics: int, seed: int = 7) -> np.ndarray:
+    """Clustered unit vectors, roughly like chunk embeddings of a few textbooks."""
+    rnd = np.random.default_rng(seed)
+    centers = rnd.standard_normal((topics, dim)).astype(np.float32)
+    vectors = centers[rnd.integers(0, topics, n)] + 0.8 * rnd.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--factors", default="1,4,8,16")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before app.config is imported
+        os.environ["VECTOR_BACKEND"] = "local"
+        os.environ["LOCAL_INDEX_DIR"] = os.path.join(tmp, "unused")
+        from app.services.vector_store import _DocumentIndex
+
+        vectors = make_vectors(args.vectors, args.dim, topics=max(8, args.vectors // 500))
+        rnd = np.random.default_rng(11)
+        picks = rnd.integers(0, args.vectors, args.queries)
+        # Paraphrase-like queries: a small perturbation of a stored chunk
+        noise = rnd.standard_normal((args.queries, args.dim)).astype(np.float32)
+        queries = vectors[picks] + 0.7 / np.sqrt(args.dim) * noise
+
+        path = os.path.join(tmp, "doc")
+        exact = _DocumentIndex(path)
+        for start in range(0, args.vectors, 1000):
+            exact.add([
+                {"id": str(i), "values": vectors[i], "metadata": {}}
+                for i in range(start, min(start + 1000, args.vectors))
+            ])
+
+        def run(index):
+            started = time.perf_counter()
+            results = [[m["id"] for m in index.search(q, args.k)] for q in queries]
+            return results, (time.perf_counter() - started) / len(queries) * 1000
+
+        baseline, exact_ms = run(exact)
+        float_mb = args.vectors * args.dim * 4 / 1e6
+        print(f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries, k={args.k}")
+        print(f"{'mode':<8}{'rerank x':>9}{'recall@k':>10}{'ms/query':>10}{'memory MB':>11}")
+        print(f"{'float32':<8}{'-':>9}{1.0:>10.3f}{exact_ms:>10.2f}{float_mb:>11.1f}")
+
+        for mode in ("int8", "binary"):
+            for factor in (int(f) for f in args.factors.split(",")):
+                # Same files, different in-memory representation
+                index = _DocumentIndex(path, quantization=mode, rerank_factor=factor)
+                index.search(queries[0], args.k)  # build the codes outside the timing
+                results, ms = run(index)
+                recall = np.mean([
+                    len(set(got) & set(want)) / args.k for got, want in zip(results, baseline)
+                ])
+                print(f"{mode:<8}{factor:>9}{recall:>10.3f}{ms:>10.2f}{index._codes.nbytes() / 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
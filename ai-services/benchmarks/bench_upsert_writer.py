@@ -0,0 +1,79 @@
+"""
+Sequential blocking upserts vs. the pipelined UpsertWriter, against the
+in-memory Pinecone stand-in with simulated latency and transient failures.
+
+Run from ai-services/:
+    python -m benchmarks.bench_upsert_writer --vectors 20000 --latency-ms 60 --failure-rate 0.05
+"""
+import os
+import time
+import asyncio
+import argparse
+
+import numpy as np
+
+
+def make_vectors(n: int, dim: int = 384) -> list:
+    rnd = np.random.default_rng(7)
+    values = rnd.standard_normal((n, dim)).astype(np.float32)
+    return [
+        {"id": f"bench_{i}", "values": values[i].tolist(), "metadata": {"storage_key": "bench", "chunk_id": i}}
+        for i in range(n)
+    ]
+
+
+def sequential(store, vectors, batch_size):
+    """The old loop: one blocking upsert after another, first failure aborts the upload."""
+    started = time.perf_counter()
+    try:
+        for i in range(0, len(vectors), batch_size):
+            store.upsert(vectors[i:i + batch_size])
+    except ConnectionError:
+        return time.perf_counter() - started, False
+    return time.perf_counter() - started, True
+
+
+async def pipelined(store, vectors, batch_size, in_flight):
+    from app.services.upsert_writer import UpsertWriter
+
+    writer = UpsertWriter(store, max_in_flight=in_flight, base_delay=0.05)
+    started = time.perf_counter()
+    for i in range(0, len(vectors), batch_size):
+        await writer.submit(vectors[i:i + batch_size])
+    await writer.drain()
+    return time.perf_counter() - started, writer.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=60)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--in-flight", default="1,2,4,8,16")
+    args = parser.parse_args()
+
+    # Must be set before app.config is imported
+    os.environ["VECTOR_BACKEND"] = "memory"
+    from app.services.vector_store import MemoryVectorStore
+
+    vectors = make_vectors(args.vectors)
+    print(f"{args.vectors} vectors in batches of {args.batch_size}, "
+          f"{args.latency_ms:g} ms per call, {args.failure_rate:.0%} transient failures")
+    print(f"{'writer':<18}{'seconds':>9}{'vectors/s':>11}{'retries':>9}{'stored':>9}")
+
+    store = MemoryVectorStore(args.latency_ms, args.failure_rate, seed=1)
+    seconds, completed = sequential(store, vectors, args.batch_size)
+    status = "all" if completed else "ABORTED"
+    print(f"{'sequential':<18}{seconds:>9.2f}{len(store) / seconds:>11.0f}{'-':>9}{status:>9}")
+
+    for in_flight in (int(n) for n in args.in_flight.split(",")):
+        store = MemoryVectorStore(args.latency_ms, args.failure_rate, seed=1)
+        seconds, stats = asyncio.run(pipelined(store, vectors, args.batch_size, in_flight))
+        stored = "all" if len(store) == args.vectors else len(store)
+        print(f"{f'pipelined x{in_flight}':<18}{seconds:>9.2f}{args.vectors / seconds:>11.0f}"
+              f"{stats['retries']:>9}{stored:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Writes synthetic text-only PDFs for the benchmarks (no extra dependencies).
+"""
+import random
+
+WORDS = (
+    "cell energy mitochondria photosynthesis chlorophyll enzyme protein membrane "
+    "respiration glucose oxygen carbon dioxide nucleus ribosome DNA RNA gene "
+    "evolution species ecosystem Newton force mass acceleration velocity momentum "
+    "the of and to in is that for as with by on are this from"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 45, words_per_line: int = 12, seed: int = 7):
+    rnd = random.Random(seed)
+    out = [b"%PDF-1.4\n"]
+    offsets = []
+
+    def add(obj: str):
+        offsets.append(sum(len(part) for part in out))
+        out.append(obj.encode("latin-1"))
+
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(pages))
+    add("1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n")
+    add(f"2 0 obj<</Type/Pages/Kids[{kids}]/Count {pages}>>endobj\n")
+    add("3 0 obj<</Type/Font/Subtype/Type1/BaseFont/Helvetica>>endobj\n")
+
+    for i in range(pages):
+        lines = []
+        for n in range(lines_per_page):
+            # Blank line every few lines so the text has paragraphs
+            if n % 9 == 8:
+                lines.append("")
+            else:
+                lines.append(" ".join(rnd.choice(WORDS) for _ in range(words_per_line)))
+        stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({_escape(l)}) '" for l in lines) + " ET"
+        add(
+            f"{4 + 2 * i} 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]"
+            f"/Resources<</Font<</F1 3 0 R>>>>/Contents {5 + 2 * i} 0 R>>endobj\n"
+        )
+        add(f"{5 + 2 * i} 0 obj<</Length {len(stream)}>>stream\n{stream}\nendstream endobj\n")
+
+    xref_offset = sum(len(part) for part in out)
+    size = len(offsets) + 1
+    xref = f"xref\n0 {size}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    xref += f"trailer<</Size {size}/Root 1 0 R>>\nstartxref\n{xref_offset}\n%%EOF\n"
+    out.append(xref.encode("latin-1"))
+
+    with open(path, "wb") as f:
+        f.write(b"".join(out))
+    return path
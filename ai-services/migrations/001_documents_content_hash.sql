@@ -0,0 +1,10 @@
+-- Content-addressed document storage.
+-- Each documents row is a user's reference to stored content; identical PDFs
+-- share one set of vectors, stored under their sha256 content hash.
+-- Rows from before this migration keep a NULL content_hash and their
+-- per-user (user_id, filename) vectors.
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash text;
+
+CREATE INDEX IF NOT EXISTS documents_content_hash_idx ON documents (content_hash);
+CREATE INDEX IF NOT EXISTS documents_user_filename_idx ON documents (user_id, filename);
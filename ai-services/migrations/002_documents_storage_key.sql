@@ -0,0 +1,13 @@
+-- Incremental re-ingestion.
+-- A documents row now points at a storage_key (the scope its vectors are
+-- stored under) separately from the content_hash of the PDF it holds, so a
+-- revised edition can be updated in place: only changed chunks are re-embedded,
+-- while identical uploads still share one storage_key through content_hash.
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS storage_key text;
+
+-- Documents stored by 001 live under their content hash
+UPDATE documents SET storage_key = content_hash
+WHERE storage_key IS NULL AND content_hash IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS documents_storage_key_idx ON documents (storage_key);
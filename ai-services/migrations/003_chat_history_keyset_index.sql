@@ -0,0 +1,12 @@
+-- Keyset pagination for GET /chat_history.
+-- Pages are read newest first, continuing from the (created_at, id) of the
+-- last row of the previous page:
+--   WHERE user_id = $1 AND filename = $2
+--     AND (created_at < $3 OR (created_at = $3 AND id < $4))
+--   ORDER BY created_at DESC, id DESC LIMIT n
+-- With this index every page is an index range scan of n rows, however long
+-- the conversation is (no OFFSET, no sort). /chat reads its recent turns with
+-- the same prefix.
+
+CREATE INDEX IF NOT EXISTS chat_history_user_filename_created_idx
+    ON chat_history (user_id, filename, created_at DESC, id DESC);
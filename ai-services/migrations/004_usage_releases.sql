@@ -0,0 +1,32 @@
+-- Idempotent quota release for /delete-book.
+-- The cleanup journal retries a step until it is recorded as done, so the
+-- usage step can run twice (e.g. the process dies right after decrementing).
+-- release_upload_quota records the deletion job and decrements the counter in
+-- one transaction: a repeated call for the same job changes nothing.
+
+CREATE TABLE IF NOT EXISTS usage_releases (
+    job_id text PRIMARY KEY,
+    user_id text NOT NULL,
+    released_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION release_upload_quota(p_user_id text, p_job_id text)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    remaining integer;
+BEGIN
+    INSERT INTO usage_releases (job_id, user_id) VALUES (p_job_id, p_user_id)
+    ON CONFLICT (job_id) DO NOTHING;
+
+    IF FOUND THEN
+        UPDATE user_usage
+           SET total_files_uploaded = GREATEST(total_files_uploaded - 1, 0)
+         WHERE user_id = p_user_id;
+    END IF;
+
+    SELECT total_files_uploaded INTO remaining FROM user_usage WHERE user_id = p_user_id;
+    RETURN remaining;
+END;
+$$;
@@ -0,0 +1,83 @@
+-- Atomic link / release of shared storage.
+-- A stored document is deleted once no documents row references its
+-- storage_key. Counting the references and linking a new upload to the same
+-- storage were separate statements, so an upload could link between the count
+-- and the delete and be left pointing at deleted vectors.
+-- These functions take a transaction-scoped advisory lock on the storage_key,
+-- so linking, releasing and counting references to one stored document run
+-- one at a time; a link that waited re-checks that the storage is still
+-- referenced before it adds a row.
+
+CREATE OR REPLACE FUNCTION storage_references(p_storage_key text)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    refs integer;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext(p_storage_key));
+    SELECT count(*) INTO refs FROM documents WHERE storage_key = p_storage_key;
+    RETURN refs;
+END;
+$$;
+
+-- Drops the user's reference; returns its storage_key and the references left
+CREATE OR REPLACE FUNCTION release_document(p_user_id text, p_filename text)
+RETURNS TABLE (storage_key text, remaining integer)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    key text;
+BEGIN
+    SELECT d.storage_key INTO key FROM documents d
+     WHERE d.user_id = p_user_id AND d.filename = p_filename
+     LIMIT 1;
+
+    IF key IS NOT NULL THEN
+        PERFORM pg_advisory_xact_lock(hashtext(key));
+    END IF;
+
+    DELETE FROM documents d WHERE d.user_id = p_user_id AND d.filename = p_filename;
+
+    IF key IS NULL THEN
+        RETURN QUERY SELECT NULL::text, 0;
+    ELSE
+        RETURN QUERY SELECT key, count(*)::integer FROM documents d WHERE d.storage_key = key;
+    END IF;
+END;
+$$;
+
+-- Points the user's document at the stored copy of p_content_hash, if one is
+-- still referenced; returns its storage_key (NULL: nothing to link to)
+CREATE OR REPLACE FUNCTION link_document(p_user_id text, p_filename text, p_content_hash text)
+RETURNS text
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    key text;
+BEGIN
+    SELECT d.storage_key INTO key FROM documents d
+     WHERE d.content_hash = p_content_hash AND d.storage_key IS NOT NULL
+     LIMIT 1;
+    IF key IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext(key));
+    -- Released while we waited for the lock: it is about to be deleted
+    IF NOT EXISTS (
+        SELECT 1 FROM documents d
+         WHERE d.storage_key = key AND d.content_hash = p_content_hash
+    ) THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE documents d SET content_hash = p_content_hash, storage_key = key
+     WHERE d.user_id = p_user_id AND d.filename = p_filename;
+    IF NOT FOUND THEN
+        INSERT INTO documents (user_id, filename, content_hash, storage_key)
+        VALUES (p_user_id, p_filename, p_content_hash, key);
+    END IF;
+    RETURN key;
+END;
+$$;
@@ -0,0 +1,33 @@
+"""
+Run from ai-services/:
+    python -m pytest -q
+
+The app's singletons read RagSettings at import time, so the environment is
+pointed at the in-memory vector store and a throwaway data directory before
+any test imports app.*.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = tempfile.mkdtemp(prefix="ai-services-tests-")
+
+os.environ.update({
+    "VECTOR_BACKEND": "memory",
+    "VISION_BACKEND": "local",
+    "EMBED_BATCH_SIZE": "8",
+    "UPSERT_BATCH_SIZE": "8",
+    "UPSERT_RETRY_BASE_DELAY": "0",
+    "PDF_PARSE_MODE": "sequential",
+    "LOCAL_INDEX_DIR": os.path.join(DATA_DIR, "vector_index"),
+    "LEXICAL_INDEX_DIR": os.path.join(DATA_DIR, "lexical_index"),
+    "MANIFEST_DIR": os.path.join(DATA_DIR, "manifests"),
+    "CHUNK_STORE_PATH": os.path.join(DATA_DIR, "chunks.sqlite3"),
+    "EMBEDDING_CACHE_PATH": os.path.join(DATA_DIR, "embeddings.sqlite3"),
+    "INGESTION_DB_PATH": os.path.join(DATA_DIR, "ingestion_jobs.sqlite3"),
+    "DELETION_DB_PATH": os.path.join(DATA_DIR, "deletion_jobs.sqlite3"),
+})
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
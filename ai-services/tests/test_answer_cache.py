@@ -0,0 +1,97 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app import rag
+from app.services.answer_cache import AnswerCache, AnswerSlot
+from app.services.vector_store import document_scope, scope_key
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def make_cache(**overrides):
+    settings = dict(enabled=True, max_entries=100, ttl=60, threshold=0.95, verify=True)
+    settings.update(overrides)
+    return AnswerCache(**settings)
+
+
+def test_similar_question_hits_other_document_misses():
+    cache = make_cache()
+    cache.store("doc-a", unit(1, 0, 0), "What is osmosis?", "Water moving...", ["chunk 1"])
+
+    assert cache.lookup("doc-a", unit(1, 0.05, 0))["answer"] == "Water moving..."
+    assert cache.lookup("doc-a", unit(0, 1, 0)) is None
+    assert cache.lookup("doc-b", unit(1, 0, 0)) is None
+
+
+def test_invalidate_drops_only_that_document():
+    cache = make_cache()
+    cache.store("doc-a", unit(1, 0, 0), "q", "answer a", ["chunk"])
+    cache.store("doc-b", unit(1, 0, 0), "q", "answer b", ["chunk"])
+
+    cache.invalidate("doc-a")
+
+    assert cache.lookup("doc-a", unit(1, 0, 0)) is None
+    assert cache.lookup("doc-b", unit(1, 0, 0))["answer"] == "answer b"
+    assert cache.stats()["entries"] == 1
+
+
+def test_false_hit_is_evicted():
+    cache = make_cache()
+    cache.store("doc", unit(1, 0, 0), "q", "answer", ["a", "b", "c"])
+    slot = AnswerSlot("doc", unit(1, 0, 0), "q", cache.lookup("doc", unit(1, 0, 0)))
+
+    assert not cache.confirm(slot, ["x", "y", "z"])
+    assert slot.answer is None
+    assert cache.lookup("doc", unit(1, 0, 0)) is None
+
+
+def test_expired_entries_are_not_served():
+    cache = make_cache(ttl=-1)
+    cache.store("doc", unit(1, 0, 0), "q", "answer", ["chunk"])
+    assert cache.lookup("doc", unit(1, 0, 0)) is None
+    assert cache.stats()["entries"] == 0
+
+
+class FakeRegistry:
+    """The user's document points at `storage_key` (document_registry without Supabase)."""
+
+    def __init__(self, storage_key):
+        self.storage_key = storage_key
+
+    async def lookup(self, user_id, filename):
+        return {"content_hash": "hash", "storage_key": self.storage_key}
+
+    async def register(self, user_id, filename, content_hash, storage_key):
+        self.storage_key = storage_key
+
+    async def references(self, storage_key):
+        return 0
+
+
+@pytest.fixture
+def cached_answer(monkeypatch):
+    cache = make_cache()
+    monkeypatch.setattr(rag, "answer_cache", cache)
+    scope = document_scope("user-1", "book.pdf", "edition-1")
+    cache.store(scope_key(scope), unit(1, 0, 0), "q", "answer", ["chunk"])
+    return cache, scope
+
+
+def test_deleting_the_document_invalidates(cached_answer):
+    cache, scope = cached_answer
+    rag.delete_stored_document(scope)
+    assert cache.lookup(scope_key(scope), unit(1, 0, 0)) is None
+
+
+def test_reingest_in_place_invalidates(cached_answer, monkeypatch):
+    cache, scope = cached_answer
+    monkeypatch.setattr(rag, "document_registry", FakeRegistry("edition-1"))
+
+    asyncio.run(rag.repoint_document("user-1", "book.pdf", "new-hash", "edition-1"))
+
+    assert cache.lookup(scope_key(scope), unit(1, 0, 0)) is None
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+pytest.importorskip("langchain_text_splitters")
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.services.chunker import SpanChunker, chunk_documents
+from benchmarks.bench_chunker import make_pages
+from benchmarks.sample_pdf import WORDS
+
+
+def reference(documents, chunk_size=1000, chunk_overlap=200):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return [(d.page_content, d.metadata) for d in splitter.split_documents(documents)]
+
+
+def spans(documents, chunk_size=1000, chunk_overlap=200):
+    return [(c.page_content, c.metadata) for c in chunk_documents(documents, chunk_size, chunk_overlap)]
+
+
+def test_matches_recursive_splitter_on_pages():
+    pages = make_pages(40)
+    assert spans(pages) == reference(pages)
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(200, 0), (300, 50), (1000, 200)])
+def test_matches_recursive_splitter_on_awkward_text(chunk_size, chunk_overlap):
+    rnd = random.Random(chunk_size)
+    texts = [
+        "",
+        "   \n\n  ",
+        "short page",
+        # No separators at all: falls through to single characters
+        "x" * (chunk_size * 3 + 17),
+        # Words longer than a chunk between ordinary ones
+        " ".join(["y" * (chunk_size + 5), "mass", "z" * (chunk_size // 2), "force"] * 3),
+        # Runs of blank lines and trailing whitespace
+        "\n\n\n".join(" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 60))) + "  "
+                      for _ in range(25)),
+    ]
+    documents = [Document(page_content=t, metadata={"source": "t.pdf", "page": i}) for i, t in enumerate(texts)]
+    assert spans(documents, chunk_size, chunk_overlap) == reference(documents, chunk_size, chunk_overlap)
+
+
+def test_spans_point_into_the_text():
+    text = make_pages(1)[0].page_content
+    for start, end in SpanChunker(300, 60).split_spans(text):
+        assert text[start:end] == text[start:end].strip()
+        assert 0 < end - start <= 300
@@ -0,0 +1,119 @@
+import re
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.supabase import repositories
+from app.supabase.repositories import ChatHistoryRepository, encode_cursor, decode_cursor
+
+_CONDITION = re.compile(r'(\w+)\.(eq|lt|gt)\."([^"]*)"')
+
+
+def _split(filters: str) -> list:
+    """Top-level comma-separated parts of a PostgREST or/and filter."""
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(filters):
+        depth += ch == "("
+        depth -= ch == ")"
+        if ch == "," and depth == 0:
+            parts.append(filters[start:i])
+            start = i + 1
+    parts.append(filters[start:])
+    return parts
+
+
+def _matches(row: dict, condition: str) -> bool:
+    if condition.startswith("and("):
+        return all(_matches(row, part) for part in _split(condition[4:-1]))
+    column, op, value = _CONDITION.fullmatch(condition).groups()
+    left = row[column]
+    right = type(left)(value)
+    return {"eq": left == right, "lt": left < right, "gt": left > right}[op]
+
+
+class FakeQuery:
+    """The subset of the PostgREST query builder ChatHistoryRepository.page uses."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.orders = []
+        self.count = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.rows = [row for row in self.rows if row[column] == value]
+        return self
+
+    def or_(self, filters):
+        self.rows = [row for row in self.rows if any(_matches(row, part) for part in _split(filters))]
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    async def execute(self):
+        rows = list(self.rows)
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda row: row[column], reverse=desc)
+        return type("Response", (), {"data": rows[:self.count]})()
+
+
+class FakeClient:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        assert name == "chat_history"
+        return FakeQuery(self.rows)
+
+
+@pytest.fixture
+def history(monkeypatch):
+    start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(1, 38):
+        # Pairs of messages saved in the same microsecond: only the id tells them apart
+        created_at = (start + timedelta(seconds=i // 2)).isoformat()
+        rows.append({"id": i, "user_id": "u", "filename": "book.pdf", "role": "user",
+                     "content": f"message {i}", "created_at": created_at})
+    rows.append({"id": 99, "user_id": "someone else", "filename": "book.pdf", "role": "user",
+                 "content": "not mine", "created_at": start.isoformat()})
+    monkeypatch.setattr(repositories, "_client", FakeClient(rows))
+    return ChatHistoryRepository()
+
+
+def test_cursor_round_trip():
+    row = {"id": 42, "created_at": "2025-03-01T10:00:00.123456+00:00", "role": "user"}
+    cursor = encode_cursor(row)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == {"created_at": row["created_at"], "id": 42}
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "eyJ4IjogMX0"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 37, 50])
+def test_pages_cover_the_conversation_once(history, limit):
+    async def walk():
+        seen, before = [], None
+        while True:
+            page = await history.page("u", "book.pdf", limit, before)
+            assert len(page) <= limit
+            seen.extend(row["id"] for row in page)
+            if len(page) < limit:
+                return seen
+            # Through an encoded cursor, as the frontend sends it back
+            before = decode_cursor(encode_cursor(page[-1]))
+
+    assert asyncio.run(walk()) == list(range(37, 0, -1))
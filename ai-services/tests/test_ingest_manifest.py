@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from app import rag
+from app.services.chunk_manifest import chunk_vector_ids, manifest_store
+from app.services.vector_store import document_scope
+from benchmarks.sample_pdf import make_pdf
+
+
+class FakeEmbedder:
+    """Deterministic stand-in for rag.embed_texts; records what it was asked to embed."""
+
+    def __init__(self, fail_on_call=None):
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+        self.texts = []
+
+    async def __call__(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise ConnectionError("embedding backend unavailable")
+        self.texts.extend(texts)
+        return [
+            [b / 255 for b in hashlib.sha256(text.encode("utf-8")).digest()[:16]]
+            for text in texts
+        ]
+
+
+@pytest.fixture
+def embedder(monkeypatch):
+    fake = FakeEmbedder()
+    monkeypatch.setattr(rag, "embed_texts", fake)
+    return fake
+
+
+def ingest(path, storage_key):
+    asyncio.run(rag.ingest_pdf(str(path), "book.pdf", "user-1", storage_key=storage_key))
+
+
+def stored_ids(storage_key):
+    return {vector_id for vector_id in rag.vector_store._vectors if vector_id.startswith(storage_key + "_")}
+
+
+def manifest(storage_key):
+    return manifest_store.load(document_scope("user-1", "book.pdf", storage_key))
+
+
+def test_vector_ids_follow_the_text():
+    ids = chunk_vector_ids("k", ["alpha", "beta", "alpha"])
+    assert ids[0] != ids[1]
+    assert ids[2] == ids[0] + "_1"
+    # Same text, same id, wherever it moves
+    assert chunk_vector_ids("k", ["beta"]) == [ids[1]]
+    # Repeats are numbered across calls sharing `seen`
+    seen = {}
+    chunk_vector_ids("k", ["alpha"], seen)
+    assert chunk_vector_ids("k", ["alpha"], seen) == [ids[2]]
+
+
+def test_revision_only_embeds_changed_chunks(tmp_path, embedder):
+    key = "revision"
+    ingest(make_pdf(tmp_path / "v1.pdf", 12), key)
+    first = manifest(key)
+    assert set(first) == stored_ids(key)
+    assert len(embedder.texts) == len(first)
+
+    # Same PDF again: nothing to embed
+    embedder.texts.clear()
+    ingest(tmp_path / "v1.pdf", key)
+    assert embedder.texts == []
+    assert manifest(key) == first
+
+    # Two pages dropped: their chunks are deleted, nothing is embedded
+    ingest(make_pdf(tmp_path / "v2.pdf", 10), key)
+    second = manifest(key)
+    assert embedder.texts == []
+    assert second == first[:len(second)]
+    assert stored_ids(key) == set(second)
+
+    # Four pages added: only the new chunks are embedded
+    ingest(make_pdf(tmp_path / "v3.pdf", 14), key)
+    third = manifest(key)
+    assert third[:len(second)] == second
+    assert len(embedder.texts) == len(third) - len(second)
+    assert stored_ids(key) == set(third)
+
+
+def test_embedding_failure_keeps_the_manifest_accurate(tmp_path, embedder):
+    key = "failure"
+    path = make_pdf(tmp_path / "book.pdf", 12)
+    embedder.fail_on_call = 3
+
+    with pytest.raises(RuntimeError, match="Embedding failed"):
+        ingest(path, key)
+    partial = manifest(key)
+    # Only what was stored is listed, so the failed chunks are not "unchanged" next time
+    assert partial
+    assert set(partial) <= stored_ids(key)
+
+    embedder.fail_on_call = None
+    embedder.texts.clear()
+    ingest(path, key)
+    complete = manifest(key)
+    assert set(complete) == stored_ids(key)
+    assert len(embedder.texts) == len(complete) - len(partial)
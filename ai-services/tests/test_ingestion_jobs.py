@@ -0,0 +1,59 @@
+import sqlite3
+import asyncio
+
+from app.services.ingestion_jobs import IngestionJobQueue
+
+
+def run_jobs(queue, handler, files):
+    async def main():
+        queue.start(handler)
+        job_ids = [queue.submit("user-1", name, f"/tmp/{name}") for name in files]
+        for _ in range(200):
+            if all(queue.get(job_id)["status"] in ("done", "failed") for job_id in job_ids):
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return job_ids
+    return asyncio.run(main())
+
+
+def test_failed_status_write_does_not_stop_the_worker(tmp_path):
+    queue = IngestionJobQueue(str(tmp_path / "jobs.sqlite3"))
+    update = queue._update
+    broken = {"calls": 0}
+
+    def flaky_update(job_id, **fields):
+        # The first job's "running" write hits a locked database
+        if broken["calls"] == 0:
+            broken["calls"] += 1
+            raise sqlite3.OperationalError("database is locked")
+        update(job_id, **fields)
+
+    queue._update = flaky_update
+    handled = []
+
+    async def handler(job, checkpoint, report):
+        handled.append(job["filename"])
+        await checkpoint(10)
+        return "ok"
+
+    first, second = run_jobs(queue, handler, ["a.pdf", "b.pdf"])
+
+    assert handled == ["a.pdf", "b.pdf"]
+    assert queue.get(first)["status"] == queue.get(second)["status"] == "done"
+    assert queue.get(second)["checkpoint"] == 10
+
+
+def test_handler_failure_is_recorded_and_the_next_job_runs(tmp_path):
+    queue = IngestionJobQueue(str(tmp_path / "jobs.sqlite3"))
+
+    async def handler(job, checkpoint, report):
+        if job["filename"] == "bad.pdf":
+            raise ValueError("not a PDF")
+        return "ok"
+
+    bad, good = run_jobs(queue, handler, ["bad.pdf", "good.pdf"])
+
+    assert queue.get(bad)["status"] == "failed"
+    assert queue.get(bad)["error"] == "not a PDF"
+    assert queue.get(good)["status"] == "done"
@@ -0,0 +1,52 @@
+import json
+import asyncio
+
+from app import rag
+from app.services.chunk_manifest import manifest_store
+from app.services.chunk_store import chunk_store
+from app.services.lexical_index import LexicalIndex, lexical_store
+from app.services.vector_store import document_scope
+from benchmarks.sample_pdf import make_pdf
+from tests.test_ingest_manifest import FakeEmbedder
+
+TEXTS = [
+    "Mitochondria produce most of the cell's energy.",
+    "Chlorophyll absorbs light for photosynthesis.",
+    "Newton's second law relates force, mass and acceleration.",
+]
+
+
+def test_texts_come_from_the_chunk_store():
+    scope = document_scope(storage_key="lexical-texts")
+    index = LexicalIndex()
+    for chunk_id, text in enumerate(TEXTS):
+        index.add(chunk_id, text, f"lexical-texts_{chunk_id}")
+    chunk_store.put_many(scope, [(f"lexical-texts_{i}", text) for i, text in enumerate(TEXTS)])
+
+    hits, _ = index.search("chlorophyll photosynthesis", 3)
+    assert hits[0][0] == 1
+    assert rag.lexical_texts(index, [chunk_id for chunk_id, _ in hits]) == [TEXTS[1]]
+    saved = json.loads(json.dumps(index.to_dict()))
+    assert set(saved) == {"doc_len", "vector_ids", "postings"}
+
+
+def test_indexes_saved_with_texts_still_answer():
+    index = LexicalIndex.from_dict({
+        "doc_len": {"0": 5},
+        "texts": {"0": TEXTS[0]},
+        "postings": {"mitochondria": {"0": 1}}
+    })
+    assert rag.lexical_texts(index, [0]) == [TEXTS[0]]
+
+
+def test_ingest_saves_only_postings_and_vector_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag, "embed_texts", FakeEmbedder())
+    path = make_pdf(tmp_path / "book.pdf", 3)
+    asyncio.run(rag.ingest_pdf(str(path), "book.pdf", "user-1", storage_key="lexical-ingest"))
+
+    scope = document_scope("user-1", "book.pdf", "lexical-ingest")
+    lexical_store._loaded.pop_where(lambda key: True)
+    index = lexical_store.load(scope)
+    assert index.texts == {}
+    assert [index.vector_ids[i] for i in sorted(index.vector_ids)] == manifest_store.load(scope)
+    assert all(rag.lexical_texts(index, [chunk_id]) for chunk_id in index.vector_ids)
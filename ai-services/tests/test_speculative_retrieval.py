@@ -0,0 +1,48 @@
+import asyncio
+
+from app.services.speculative_retrieval import SpeculativeRetriever
+
+
+def search(results, delay=0.0):
+    async def retrieval():
+        await asyncio.sleep(delay)
+        return results
+    return retrieval()
+
+
+def resolve(speculative, fresh, **flags):
+    """Runs one /chat resolve; returns (chunks, retriever, speculation)."""
+    retriever = SpeculativeRetriever(enabled=True, min_overlap=0.6, skip_rephrase=False)
+
+    async def main():
+        speculation = retriever.start(speculative)
+        await asyncio.sleep(0.01)
+
+        async def fetch(query):
+            return fresh
+
+        return await retriever.resolve(speculation, "query", fetch, **flags), speculation
+
+    chunks, speculation = asyncio.run(main())
+    return chunks, retriever, speculation
+
+
+def test_raw_message_reuses_the_speculative_search():
+    chunks, retriever, _ = resolve(search(["a", "b", "c"]), ["x"])
+    assert chunks == ["a", "b", "c"]
+    assert retriever.outcomes["reused"] == 1
+    assert retriever.saved_ms.total == 1
+
+
+def test_rephrased_query_uses_its_own_search():
+    chunks, retriever, _ = resolve(search(["a", "b", "c"]), ["a", "b", "d"], rephrased=True)
+    assert chunks == ["a", "b", "d"]
+    assert retriever.outcomes["agreed"] == 1
+    assert retriever.saved_ms.total == 0
+
+
+def test_rephrased_query_does_not_wait_for_the_speculation():
+    chunks, retriever, speculation = resolve(search(["a"], delay=5), ["x", "y", "z"], rephrased=True)
+    assert chunks == ["x", "y", "z"]
+    assert speculation.task.cancelled()
+    assert retriever.stats()["agreement_rate"] is None
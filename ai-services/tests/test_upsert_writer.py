@@ -0,0 +1,129 @@
+import time
+import random
+import asyncio
+import threading
+
+import pytest
+
+from app.services.upsert_writer import UpsertWriter
+from app.services.vector_store import MemoryVectorStore
+
+
+class SlowStore(MemoryVectorStore):
+    """Upserts take a random time (so batches finish out of order); batches listed in `fail` always fail."""
+
+    def __init__(self, seed=3, max_latency=0.02, fail=()):
+        super().__init__()
+        self._delays = random.Random(seed)
+        self.max_latency = max_latency
+        self.fail = set(fail)
+        self.in_flight = 0
+        self.max_seen = 0
+        self.written = []
+        self._count_lock = threading.Lock()
+
+    def upsert(self, vectors):
+        with self._count_lock:
+            self.in_flight += 1
+            self.max_seen = max(self.max_seen, self.in_flight)
+            delay = self._delays.uniform(0, self.max_latency)
+        try:
+            time.sleep(delay)
+            if vectors[0]["metadata"]["batch"] in self.fail:
+                raise ConnectionError("batch rejected")
+            super().upsert(vectors)
+            with self._count_lock:
+                self.written.append(vectors[0]["metadata"]["batch"])
+        finally:
+            with self._count_lock:
+                self.in_flight -= 1
+
+
+def batch(n, size=3):
+    return [
+        {"id": f"b{n}-{i}", "values": [1.0, float(n), float(i)], "metadata": {"batch": n}}
+        for i in range(size)
+    ]
+
+
+def run(writer, batches, after_submit=None):
+    async def main():
+        try:
+            for n in range(batches):
+                await writer.submit(batch(n), marker=n)
+                if after_submit:
+                    after_submit(n)
+        finally:
+            # Even after a failed submit: let the batches already written commit
+            await writer.drain()
+    asyncio.run(main())
+
+
+def test_commits_in_submission_order():
+    store = SlowStore()
+    committed = []
+
+    async def on_commit(marker):
+        committed.append(marker)
+
+    writer = UpsertWriter(store, max_in_flight=4, max_retries=0, on_commit=on_commit)
+    run(writer, 20)
+
+    assert store.written != sorted(store.written)  # finished out of order...
+    assert committed == list(range(20))            # ...but committed in order
+    assert len(store) == 60
+    assert writer.stats() == {"batches": 20, "vectors": 60, "retries": 0}
+
+
+def test_submit_waits_for_a_free_slot():
+    store = SlowStore(max_latency=0.01)
+    writer = UpsertWriter(store, max_in_flight=2, max_retries=0)
+    outstanding = []
+
+    run(writer, 12, after_submit=lambda n: outstanding.append(n + 1 - len(store.written)))
+
+    assert store.max_seen == 2
+    assert max(outstanding) <= 2
+
+
+def test_transient_failures_are_retried():
+    store = MemoryVectorStore(failure_rate=0.3, seed=1)
+    writer = UpsertWriter(store, max_in_flight=3, max_retries=10, base_delay=0)
+    run(writer, 15)
+
+    assert len(store) == 45
+    assert writer.retries == store.failures > 0
+
+
+def test_nothing_after_a_failed_batch_is_committed():
+    store = SlowStore(fail={2})
+    committed = []
+
+    async def on_commit(marker):
+        committed.append(marker)
+
+    writer = UpsertWriter(store, max_in_flight=3, max_retries=1, base_delay=0, on_commit=on_commit)
+    with pytest.raises(ConnectionError):
+        run(writer, 6)
+
+    assert committed == [0, 1]
+
+
+def test_cancel_returns_once_no_upsert_is_running():
+    store = SlowStore(max_latency=0.1)
+    writer = UpsertWriter(store, max_in_flight=2, max_retries=0)
+
+    async def main():
+        for n in range(2):
+            await writer.submit(batch(n), marker=n)
+        submitting = asyncio.create_task(writer.submit(batch(2), marker=2))  # waits for a slot
+        await asyncio.sleep(0.01)
+        await writer.cancel()
+        submitting.cancel()
+        stored = len(store)
+        await asyncio.sleep(0.15)
+        return stored
+
+    stored = asyncio.run(main())
+    assert store.in_flight == 0
+    assert len(store) == stored  # nothing lands after cancel() returned
@@ -0,0 +1,130 @@
+import io
+import base64
+import asyncio
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.services.vision_service import (
+    LocalVisionClient, VisionClient, VisionPipeline, perceptual_hash, prepare_image
+)
+
+
+def slide(mark=False, size=(1600, 1200)) -> Image.Image:
+    """A lecture slide: title bar and lines of "text"; `mark` adds a small red annotation."""
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, size[0], 150), fill=(30, 60, 140))
+    for i in range(8):
+        draw.rectangle((100, 250 + i * 100, 1000 + (i * 137) % 500, 290 + i * 100), fill=(40, 40, 40))
+    if mark:
+        draw.rectangle((1300, 1050, 1320, 1070), fill=(200, 30, 30))
+    return image
+
+
+def encode(image: Image.Image, format="PNG", data_url=True) -> str:
+    out = io.BytesIO()
+    image.save(out, format=format)
+    raw = base64.b64encode(out.getvalue()).decode()
+    return f"data:image/{format.lower()};base64,{raw}" if data_url else raw
+
+
+def pipeline(client=None, **overrides) -> VisionPipeline:
+    settings = dict(max_side=1024, quality=80, timeout=5, cache_size=16, max_distance=0)
+    settings.update(overrides)
+    return VisionPipeline(client or LocalVisionClient(), **settings)
+
+
+def test_vision_client_is_abstract():
+    with pytest.raises(TypeError):
+        VisionClient()
+
+
+def test_same_image_is_described_once():
+    vision = pipeline()
+    image = encode(slide())
+
+    first = asyncio.run(vision.describe(image))
+    # Sent again, without the data URL header this time
+    second = asyncio.run(vision.describe(image.split(",", 1)[1]))
+
+    assert first == second
+    assert vision.client.calls == 1
+    assert vision.exact_hits == 1
+
+
+def test_concurrent_requests_share_one_call():
+    vision = pipeline(LocalVisionClient(delay=0.05))
+    image = encode(slide())
+
+    async def both():
+        return await asyncio.gather(vision.describe(image), vision.describe(image))
+
+    first, second = asyncio.run(both())
+    assert first == second
+    assert vision.client.calls == 1
+
+
+def test_edited_image_is_not_answered_from_cache():
+    original, edited = slide(), slide(mark=True)
+    distance = (perceptual_hash(original) ^ perceptual_hash(edited)).bit_count()
+    assert 0 < distance <= 8  # close enough that a near match would have reused it
+
+    vision = pipeline()
+    asyncio.run(vision.describe(encode(original)))
+    asyncio.run(vision.describe(encode(edited)))
+
+    assert vision.client.calls == 2
+    assert vision.near_hits == 0
+
+
+def test_near_matches_when_allowed():
+    vision = pipeline(max_distance=8)
+    asyncio.run(vision.describe(encode(slide())))
+    asyncio.run(vision.describe(encode(slide(mark=True))))
+
+    assert vision.client.calls == 1
+    assert vision.near_hits == 1
+
+
+def test_large_image_is_downscaled_before_sending():
+    vision = pipeline()
+    image = encode(slide(size=(3200, 2400)))
+
+    prepared = prepare_image(image, max_side=1024, quality=80)
+    description = asyncio.run(vision.describe(image))
+
+    assert prepared.size == (1024, 768)
+    assert "1024x768" in description
+    assert vision.bytes_sent < vision.bytes_in
+
+
+def test_small_image_keeps_its_size():
+    prepared = prepare_image(encode(slide(size=(640, 480)), format="JPEG", data_url=False), 1024, 80)
+    assert prepared.size == (640, 480)
+
+
+def test_not_an_image():
+    with pytest.raises(ValueError):
+        prepare_image(base64.b64encode(b"%PDF-1.4 not an image").decode(), 1024, 80)
+
+
+class FailingClient(VisionClient):
+    def __init__(self):
+        self.calls = 0
+
+    def describe(self, jpeg_base64):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("vision backend unavailable")
+        return "A slide."
+
+
+def test_failures_are_not_cached():
+    vision = pipeline(FailingClient())
+    image = encode(slide())
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(vision.describe(image))
+    assert asyncio.run(vision.describe(image)) == "A slide."
+    assert vision.errors == 1
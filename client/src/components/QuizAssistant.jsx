@@ -102,6 +102,24 @@ const QuizAssistant = ({ getToken, userId }) => {
     };
   }, [userId]);
 
+  const waitForUploadJob = async (jobId, token) => {
+    while (true) {
+      const res = await fetch(`${API_BASE_URL}/upload/status/${jobId}`, {
+        headers: {
+          Authorization: `Bearer ${token}`,
+          "user-id": userId,
+        },
+      });
+      if (!res.ok) throw new Error("Failed to check upload status");
+
+      const job = await res.json();
+      if (job.status === "done") return job;
+      if (job.status === "failed") throw new Error(job.error || "Processing failed");
+
+      await new Promise((resolve) => setTimeout(resolve, 1500));
+    }
+  };
+
   const handleFileUpload = async (e) => {
     const selectedFile = e.target.files[0];
     if (!selectedFile) return;
@@ -130,6 +148,11 @@ const QuizAssistant = ({ getToken, userId }) => {
 
       const data = await response.json();
 
+      // Processing runs as a background job; wait for it to finish
+      if (data.job_id) {
+        await waitForUploadJob(data.job_id, token);
+      }
+
       // Success
       setProgress(100);
       setStatusMsg("Complete!");
@@ -42,6 +42,8 @@ const Tutor = () => {
   // --- STATE SPLIT ---
   const [loading, setLoading] = useState(false);
   const [historyLoading, setHistoryLoading] = useState(false);
+  const [historyCursor, setHistoryCursor] = useState(null); // Cursor of the page before the oldest loaded message
+  const [earlierLoading, setEarlierLoading] = useState(false);
   const [filesLoading, setFilesLoading] = useState(true);
 
   // Auto-scroll
@@ -107,26 +109,31 @@ const Tutor = () => {
     fetchFiles();
   }, []);
 
-  // Load History
+  // Load History (one page, newest messages; older pages on demand)
+  const fetchHistoryPage = async (filename, cursor) => {
+    const token = await getToken();
+    const params = new URLSearchParams({ filename });
+    if (cursor) params.set("before", cursor);
+    const response = await fetch(`${API_BASE_URL}/chat_history?${params}`, {
+      headers: { Authorization: `Bearer ${token}`, "user-id": userId },
+    });
+    const data = await response.json();
+
+    const historyWithFlags = (data.history || []).map((msg) => ({
+      ...msg,
+      isNew: false,
+    }));
+    return { history: historyWithFlags, nextCursor: data.next_cursor || null };
+  };
+
   const loadChatHistory = async (filename) => {
     setHistoryLoading(true);
     setMessages([]);
+    setHistoryCursor(null);
     try {
-      const token = await getToken();
-      const response = await fetch(
-        `${API_BASE_URL}/chat_history?filename=${filename}`,
-        {
-          headers: { Authorization: `Bearer ${token}`, "user-id": userId },
-        },
-      );
-      const data = await response.json();
-
-      const historyWithFlags = (data.history || []).map((msg) => ({
-        ...msg,
-        isNew: false,
-      }));
-
-      setMessages(historyWithFlags);
+      const { history, nextCursor } = await fetchHistoryPage(filename);
+      setMessages(history);
+      setHistoryCursor(nextCursor);
     } catch (error) {
       console.error("Error loading history:", error);
     } finally {
@@ -134,6 +141,23 @@ const Tutor = () => {
     }
   };
 
+  const loadEarlierMessages = async () => {
+    if (!historyCursor || earlierLoading) return;
+    setEarlierLoading(true);
+    try {
+      const { history, nextCursor } = await fetchHistoryPage(
+        selectedFile,
+        historyCursor,
+      );
+      setMessages((prev) => [...history, ...prev]);
+      setHistoryCursor(nextCursor);
+    } catch (error) {
+      console.error("Error loading earlier messages:", error);
+    } finally {
+      setEarlierLoading(false);
+    }
+  };
+
   const toggleMode = (mode) => {
     if (mode === "socratic") {
       setIsSocratic(!isSocratic);
@@ -172,7 +196,7 @@ const Tutor = () => {
 
     try {
       const token = await getToken();
-      const response = await fetch(`${API_BASE_URL}/chat`, {
+      const response = await fetch(`${API_BASE_URL}/chat/stream`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -188,16 +212,37 @@ const Tutor = () => {
         }),
       });
 
-      const data = await response.json();
+      if (!response.ok) throw new Error("Chat failed");
+
+      // Server-Sent Events: show tokens as they arrive
+      let answer = "";
+      const updateAnswer = (content) =>
+        setMessages((prev) => {
+          const last = prev[prev.length - 1];
+          const message = { role: "assistant", content, isNew: false };
+          return last?.role === "assistant"
+            ? [...prev.slice(0, -1), message]
+            : [...prev, message];
+        });
 
-      setMessages((prev) => [
-        ...prev,
-        {
-          role: "assistant",
-          content: data.response,
-          isNew: true,
-        },
-      ]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1] || "message";
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+          if (event === "error") throw new Error(data.detail);
+          answer = event === "done" ? data.response : answer + data.token;
+          updateAnswer(answer);
+        }
+      }
     } catch (error) {
       console.error(error);
       setMessages((prev) => [
@@ -485,7 +530,21 @@ const Tutor = () => {
               </p>
             </div>
           ) : (
-            messages.map((msg, idx) => (
+            <>
+            {historyCursor && (
+              <div className="flex justify-center">
+                <button
+                  type="button"
+                  onClick={loadEarlierMessages}
+                  disabled={earlierLoading}
+                  className="inline-flex items-center gap-2 px-3 py-1.5 rounded-lg bg-gray-900 text-gray-400 text-xs font-medium hover:text-white disabled:opacity-50"
+                >
+                  {earlierLoading && <Loader2 className="w-3 h-3 animate-spin" />}
+                  Load earlier messages
+                </button>
+              </div>
+            )}
+            {messages.map((msg, idx) => (
               <div
                 key={idx}
                 className={`flex gap-4 ${
@@ -538,9 +597,10 @@ const Tutor = () => {
                   )}
                 </div>
               </div>
-            ))
+            ))}
+            </>
           )}
-          {loading && (
+          {loading && messages[messages.length - 1]?.role === "user" && (
             <div className="flex gap-4 animate-pulse">
               <div className="w-8 h-8 rounded-full bg-emerald-600/50 flex items-center justify-center shrink-0">
                 <Sparkles className="w-4 h-4 text-white/50" />